@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from .batch import AGS_PATTERN, collect_inputs, convert_batch
+from .exporter import LAYER_GROUPINGS, OUTPUT_FORMATS, TEST_TYPES
+from .palette import SoilPalette
+from .spatial import SiteFilter
+from .validation import format_issue
+
+DEFAULT_TEMPLATE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "FieldTestImportTemplate.xlsx",
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ags_to_geo5",
+        description="Convert AGS files to GEO5 import workbooks in parallel.",
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="AGS files, directories or glob patterns"
+    )
+    parser.add_argument(
+        "-o", "--output-dir", help="where to write results (default: next to input)"
+    )
+    parser.add_argument("-t", "--template", default=DEFAULT_TEMPLATE)
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="worker processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--parse-jobs",
+        type=int,
+        default=1,
+        help="processes per file for parsing large files (default: 1)",
+    )
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("--pattern", default=AGS_PATTERN)
+    parser.add_argument(
+        "--cache-dir", help="reuse/fill the parsed-table cache (needs pyarrow)"
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default="xlsx",
+        help="GEO5 import workbook, or the FieldTests and Layers tables as "
+        "separate <name>_<table> files (default: xlsx)",
+    )
+    parser.add_argument(
+        "--layers",
+        choices=list(LAYER_GROUPINGS),
+        default="merged",
+        help="one Layers row per GEOL_LEG of each hole, or per GEOL row "
+        "(default: merged)",
+    )
+    parser.add_argument(
+        "--test-type",
+        choices=list(TEST_TYPES),
+        default="standard",
+        help='FieldTests template: "EN - Standard : Borehole" or '
+        '"(local set) : Borehole" (default: standard)',
+    )
+    parser.add_argument(
+        "--classify",
+        nargs="?",
+        const=True,
+        default=False,
+        metavar="JSON",
+        help="fill the Layers EN ISO 14688-1 classification column from the "
+        "soil names, optionally with extra classes from a JSON file, e.g. "
+        '{"PEAT": "Peat"}',
+    )
+    parser.add_argument(
+        "--palette",
+        metavar="JSON",
+        help='fixed Layers colours per GEOL_LEG, e.g. {"201": "#A0522D"}',
+    )
+    subset = parser.add_argument_group(
+        "site subset",
+        "export only the holes inside any of these shapes (easting/northing) "
+        "or listed by LOCA_ID",
+    )
+    subset.add_argument(
+        "--bbox", nargs=4, type=float, metavar=("XMIN", "YMIN", "XMAX", "YMAX")
+    )
+    subset.add_argument("--radius", nargs=3, type=float, metavar=("X", "Y", "R"))
+    subset.add_argument(
+        "--polygon", metavar="JSON", help="file with a list of [x, y] vertices"
+    )
+    subset.add_argument("--boreholes", nargs="+", metavar="LOCA_ID", default=())
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="check row widths, GEOL depths and GEOL/LOCA hole IDs while "
+        "parsing; files with errors fail before any workbook is written",
+    )
+    parser.add_argument(
+        "--state",
+        metavar="PATH",
+        help="incremental re-export: only rebuild boreholes changed since the "
+        "export that saved PATH (single input file only)",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="write per-file results and stage timings as JSON ('-' for stdout)",
+    )
+    parser.add_argument(
+        "--cprofile", action="store_true", help="add cProfile hot spots per stage"
+    )
+    parser.add_argument(
+        "--tracemalloc", action="store_true", help="add peak memory per stage"
+    )
+    args = parser.parse_args(argv)
+
+    files = collect_inputs(args.inputs, args.pattern, args.recursive)
+    if not files:
+        parser.error("no AGS files found")
+    if args.state and len(files) > 1:
+        parser.error("--state works with a single input file")
+    if args.state and args.format != "xlsx":
+        parser.error("--state only works with --format xlsx")
+    palette = None
+    if args.palette:
+        try:
+            palette = SoilPalette.from_json(args.palette)
+        except (OSError, ValueError) as exc:
+            parser.error(f"--palette: {exc}")
+    site = None
+    if args.bbox or args.radius or args.polygon or args.boreholes:
+        try:
+            polygon = None
+            if args.polygon:
+                with open(args.polygon, encoding="utf-8") as f:
+                    polygon = json.load(f)
+            site = SiteFilter(args.bbox, polygon, args.radius, args.boreholes)
+        except (OSError, TypeError, ValueError) as exc:
+            parser.error(f"--polygon: {exc}")
+    # Keep stdout clean for the JSON report when it is written there
+    log = sys.stderr if args.profile_json == "-" else sys.stdout
+    start = time.perf_counter()
+    failed = 0
+    results = []
+    for result in convert_batch(
+        files,
+        args.template,
+        args.output_dir,
+        args.jobs,
+        cache_dir=args.cache_dir,
+        profile=args.cprofile,
+        trace_memory=args.tracemalloc,
+        state_path=args.state,
+        parse_jobs=args.parse_jobs,
+        palette=palette,
+        site=site,
+        grouping=args.layers,
+        test_type=TEST_TYPES[args.test_type],
+        classify=args.classify,
+        validate=args.validate,
+        output_format=args.format,
+    ):
+        results.append(result)
+        seconds = result["seconds"]
+        timing = f"{seconds:7.2f}s" if seconds is not None else "      - "
+        if result["error"]:
+            failed += 1
+            # A validation error lists its findings below, not in the summary
+            error = result["error"].splitlines()[0]
+            print(
+                f"FAIL {timing}  {result['file']}: {error}",
+                file=log,
+                flush=True,
+            )
+        else:
+            stages = " ".join(
+                f"{s['stage']} {s['seconds']:.2f}" for s in result["timings"]["stages"]
+            )
+            output = ", ".join(result.get("files", [result["output"]]))
+            print(
+                f"ok   {timing}  {result['file']} -> {output}  [{stages}]",
+                file=log,
+                flush=True,
+            )
+            changes = result.get("changes")
+            if changes:
+                print(
+                    f"     {len(changes['added'])} added, "
+                    f"{len(changes['changed'])} changed, "
+                    f"{len(changes['removed'])} removed, "
+                    f"{changes['unchanged']} unchanged boreholes"
+                    + (" (full rebuild)" if changes["full_rebuild"] else ""),
+                    file=log,
+                )
+                for kind in ("added", "changed", "removed"):
+                    if changes[kind]:
+                        print(f"     {kind}: {', '.join(changes[kind])}", file=log)
+        for found in result.get("issues", ()):
+            print(f"     {format_issue(found)}", file=log)
+    total = time.perf_counter() - start
+    print(f"{len(files) - failed}/{len(files)} converted in {total:.2f}s", file=log)
+    if args.profile_json:
+        report = json.dumps({"total_seconds": total, "files": results}, indent=2)
+        if args.profile_json == "-":
+            print(report)
+        else:
+            with open(args.profile_json, "w", encoding="utf-8") as f:
+                f.write(report)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,36 +1,521 @@
 import pandas as pd
 import csv
+import mmap
+import os
+import re
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
 
+from .validation import ERROR, WARNING, issue
 
-def parse_group(content, group_name):
-    lines = content.splitlines()
-    parsed = list(csv.reader(lines, delimiter=",", quotechar='"'))
-    headings = []
-    data = []
-    in_group = False
-    for row in parsed:
-        if row and row[0] == "GROUP" and len(row) > 1 and row[1] == group_name:
-            in_group = True
-            continue
-        if in_group and row and row[0] == "HEADING":
-            headings = row[1:]
+# Descriptor lines that open or describe a GROUP block. Everything else inside
+# a block (DATA rows, blank lines) lies between the last descriptor and the
+# next GROUP line, so one regex scan is enough to locate every block.
+DESCRIPTORS = ("GROUP", "HEADING", "UNIT", "TYPE")
+
+_DESCRIPTOR_ALT = "|".join(DESCRIPTORS)
+_DESCRIPTOR_RE = re.compile(rf'^(?:\ufeff)?"?({_DESCRIPTOR_ALT})"?,', re.M)
+_DESCRIPTOR_RE_BYTES = re.compile(
+    rf'^(?:\xef\xbb\xbf)?"?({_DESCRIPTOR_ALT})"?,'.encode(), re.M
+)
+
+
+# AGS4 data types (from the TYPE row) that map onto native pandas dtypes.
+# Anything else (ID, X, XN, T, DMS, RL, ...) is kept as text.
+_NUMERIC_TYPE_RE = re.compile(r"^(\d+(DP|SF|SCI)|U|MC)$")
+_CATEGORY_TYPES = ("PA", "PT", "PU", "YN")
+
+# Text columns (LOCA_ID, FILE_FSET, ABBR_HDNG, ...) whose distinct values are
+# at most this fraction of the rows are dictionary-encoded as categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _ags_kind(ags_type, unit):
+    ags_type = ags_type.strip().upper()
+    if _NUMERIC_TYPE_RE.match(ags_type):
+        return "numeric"
+    if ags_type == "DT" and unit.lower().startswith("yyyy"):
+        return "datetime"
+    if ags_type in _CATEGORY_TYPES:
+        return "category"
+    return None
+
+
+def _typed_column(values, kind):
+    if kind == "numeric":
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce")
+    if kind == "datetime":
+        return pd.to_datetime(
+            pd.Series(values, dtype=object), errors="coerce", format="ISO8601"
+        )
+    if kind == "category":
+        return pd.Categorical(values)
+    if len(values) > 1 and CATEGORY_MAX_RATIO > 0:
+        encoded = pd.Categorical(values)
+        if len(encoded.categories) <= CATEGORY_MAX_RATIO * len(values):
+            return encoded
+    return list(values)
+
+
+def build_frame(headings, rows, units=(), types=(), typed=True):
+    """Build a group DataFrame from tokenized DATA rows.
+
+    With ``typed`` the TYPE row decides each column's dtype: numeric types
+    (nDP, nSF, nSCI, U, MC) become float64, DT with a date UNIT becomes
+    datetime64 and abbreviation/yes-no types (PA, PT, PU, YN) become
+    categoricals, as do other text columns with many repeated values (see
+    CATEGORY_MAX_RATIO). The UNIT and TYPE rows are kept in ``df.attrs``.
+    """
+    units = list(units) + [""] * (len(headings) - len(units))
+    types = list(types) + [""] * (len(headings) - len(types))
+    if not typed:
+        df = pd.DataFrame(rows, columns=headings)
+    else:
+        columns = list(zip_longest(*rows, fillvalue=None))
+        columns += [(None,) * len(rows)] * (len(headings) - len(columns))
+        df = pd.DataFrame(
+            {
+                i: _typed_column(values, _ags_kind(ags_type, unit))
+                for i, (values, ags_type, unit) in enumerate(zip(columns, types, units))
+            },
+            index=pd.RangeIndex(len(rows)),
+        )
+        df.columns = pd.Index(headings, dtype=object)
+    df.attrs["UNIT"] = dict(zip(headings, units))
+    df.attrs["TYPE"] = dict(zip(headings, types))
+    return df
+
+
+def _parse_line(line):
+    row = next(csv.reader([line], delimiter=",", quotechar='"'), [])
+    if row and row[0].startswith("\ufeff"):
+        row[0] = row[0][1:]
+    return row
+
+
+def _count_lines(buf, start, end, newline):
+    # str/bytes can count in place; mmap has no count() so slice it instead
+    if hasattr(buf, "count"):
+        return buf.count(newline, start, end)
+    return buf[start:end].count(newline)
+
+
+class AgsBlock:
+    """Position of one GROUP block within the scanned content.
+
+    Offsets are indexes into the content (bytes for binary input, characters
+    for text). Rows are 0-based line numbers; ``end_row`` is exclusive.
+    """
+
+    __slots__ = (
+        "name",
+        "start",
+        "end",
+        "offsets",
+        "data_start",
+        "start_row",
+        "data_row",
+        "end_row",
+    )
+
+    def __init__(self, name, start, start_row):
+        self.name = name
+        self.start = start
+        self.end = start
+        self.offsets = {"GROUP": start}
+        self.data_start = start
+        self.start_row = start_row
+        self.data_row = start_row
+        self.end_row = start_row
+
+    def __repr__(self):
+        return (
+            f"AgsBlock({self.name!r}, offsets={self.start}:{self.end}, "
+            f"rows={self.start_row}:{self.end_row})"
+        )
+
+
+# Below this many bytes of selected group blocks, starting a process pool
+# costs more than it saves and AgsIndex.frames parses in-process
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+
+def _parse_block(source, start, end, group_name, encoding, typed):
+    # Runs in a worker: ``source`` is a file path (mapped here) or the block
+    # content itself, which then holds just this one GROUP
+    if isinstance(source, (str, os.PathLike)) and end is not None:
+        with open(source, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                source = mm[start:end]
+    index = AgsIndex(source, encoding)
+    frame = index.frame(group_name, typed=typed)
+    return frame, index.row_issues.get(group_name, [])
+
+
+class AgsIndex:
+    """Single scan over AGS content recording where every GROUP block lives.
+
+    Groups are tokenized only when asked for, from their own slice of the
+    content, so fetching any number of groups never rescans the file. The
+    scan and the tokenizer note structural problems as they go, see issues.
+    """
+
+    def __init__(self, content, encoding="utf-8"):
+        self.content = content
+        self.encoding = encoding
+        self.is_text = isinstance(content, str)
+        self.path = None
+        self.blocks = {}
+        self.scan_issues = []
+        self.row_issues = {}
+        self._scan()
+
+    @classmethod
+    def from_path(cls, path, encoding="utf-8"):
+        """Index a file through a read-only mmap instead of reading it in."""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return cls(b"", encoding)
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        index = cls(content, encoding)
+        index.path = os.fspath(path)
+        return index
+
+    def _scan(self):
+        buf = self.content
+        if self.is_text:
+            pattern, newline = _DESCRIPTOR_RE, "\n"
+        else:
+            pattern, newline = _DESCRIPTOR_RE_BYTES, b"\n"
+        current = None
+        row, row_pos = 0, 0
+        for match in pattern.finditer(buf):
+            pos = match.start()
+            row += _count_lines(buf, row_pos, pos, newline)
+            row_pos = pos
+            line_end = buf.find(newline, match.end())
+            if line_end == -1:
+                line_end = len(buf)
+            kind = match.group(1)
+            if not self.is_text:
+                kind = kind.decode("ascii")
+            if kind == "GROUP":
+                if current is not None:
+                    current.end, current.end_row = pos, row
+                fields = _parse_line(self._decode(buf[pos:line_end]).rstrip("\r"))
+                name = fields[1] if len(fields) > 1 else ""
+                current = AgsBlock(name, pos, row)
+                # Like the original parser, only the first block of a group counts
+                if name in self.blocks:
+                    self.scan_issues.append(
+                        issue(
+                            WARNING,
+                            "duplicate-group",
+                            f"repeated GROUP {name} is ignored",
+                            name,
+                            line=row + 1,
+                        )
+                    )
+                self.blocks.setdefault(name, current)
+            elif current is not None:
+                current.offsets[kind] = pos
+            else:
+                continue
+            current.data_start = line_end + 1
+            current.data_row = row + 1
+        if current is not None:
+            current.end = len(buf)
+            current.end_row = row + _count_lines(buf, row_pos, len(buf), newline)
+            if buf[-1:] not in ("\n", b"\n"):
+                current.end_row += 1
+        else:
+            self.scan_issues.append(
+                issue(ERROR, "no-groups", "no GROUP lines found; not an AGS4 file")
+            )
+        for name, block in self.blocks.items():
+            if "HEADING" not in block.offsets:
+                self.scan_issues.append(
+                    issue(
+                        ERROR,
+                        "missing-heading",
+                        f"GROUP {name} has no HEADING row",
+                        name,
+                        line=block.start_row + 1,
+                    )
+                )
+
+    def _decode(self, chunk):
+        if self.is_text:
+            return chunk
+        return bytes(chunk).decode(self.encoding)
+
+    def __contains__(self, group_name):
+        return group_name in self.blocks
+
+    def __iter__(self):
+        return iter(self.blocks)
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def descriptor(self, group_name, kind):
+        """Return the HEADING/UNIT/TYPE fields of a group (without the keyword)."""
+        block = self.blocks.get(group_name)
+        if block is None or kind not in block.offsets:
+            return []
+        start = block.offsets[kind]
+        newline = "\n" if self.is_text else b"\n"
+        end = self.content.find(newline, start, block.end)
+        if end == -1:
+            end = block.end
+        return _parse_line(self._decode(self.content[start:end]).rstrip("\r"))[1:]
+
+    def headings(self, group_name):
+        return self.descriptor(group_name, "HEADING")
+
+    def rows(self, group_name):
+        """Tokenize the DATA rows of one group, trimmed to the HEADING width."""
+        block = self.blocks.get(group_name)
+        if block is None:
+            return []
+        width = len(self.headings(group_name))
+        text = self._decode(self.content[block.data_start : block.end])
+        reader = csv.reader(text.splitlines(), delimiter=",", quotechar='"')
+        rows = [row for row in reader if row and row[0] == "DATA"]
+        # Width check on the tokenized rows: one len() per row, and the line
+        # numbers are only worked out for the rows that fail it
+        issues = []
+        if "HEADING" in block.offsets:
+            bad = [i for i, row in enumerate(rows) if len(row) != width + 1]
+            if bad:
+                issues = self._width_issues(group_name, text, rows, bad, width)
+        self.row_issues[group_name] = issues
+        return [row[1 : width + 1] for row in rows]
+
+    def _width_issues(self, group_name, text, rows, bad, width):
+        block = self.blocks[group_name]
+        lines = []
+        reader = csv.reader(text.splitlines(), delimiter=",", quotechar='"')
+        for row in reader:
+            if row and row[0] == "DATA":
+                lines.append(block.data_row + reader.line_num)
+        found = []
+        for i in bad:
+            fields = len(rows[i]) - 1
+            if fields < width:
+                code, detail = "short-row", "missing values are left empty"
+            else:
+                code, detail = "long-row", "the extra values are dropped"
+            found.append(
+                issue(
+                    ERROR,
+                    code,
+                    f"DATA row has {fields} values but HEADING has {width}; {detail}",
+                    group_name,
+                    line=lines[i],
+                    row=i + 1,
+                )
+            )
+        return found
+
+    def issues(self, groups=None):
+        """Findings of the scan plus the row findings of ``groups``.
+
+        ``groups`` defaults to every group tokenized so far.
+        """
+        found = list(self.scan_issues)
+        for name in self.row_issues if groups is None else groups:
+            found.extend(self.row_issues.get(name, ()))
+        return sorted(found, key=lambda i: i["line"] or 0)
+
+    def frame(self, group_name, typed=True):
+        return build_frame(
+            self.headings(group_name),
+            self.rows(group_name),
+            units=self.descriptor(group_name, "UNIT"),
+            types=self.descriptor(group_name, "TYPE"),
+            typed=typed,
+        )
+
+    def frames(self, groups=None, jobs=None, typed=True):
+        """Build several group frames, in parallel for large inputs.
+
+        Returns ``{group_name: DataFrame}`` for ``groups`` (default: all, in
+        file order; names not in the file are skipped). When ``jobs`` is not 1,
+        there are at least two groups and their blocks add up to
+        PARALLEL_MIN_BYTES or more, the blocks are tokenized on a process pool
+        of ``jobs`` workers (default: one per CPU). Workers re-map the file
+        when the index came from from_path, otherwise they are sent their
+        block's slice of the content.
+        """
+        names = [g for g in (self if groups is None else groups) if g in self]
+        blocks = [self.blocks[name] for name in names]
+        size = sum(block.end - block.start for block in blocks)
+        if jobs == 1 or len(blocks) < 2 or size < PARALLEL_MIN_BYTES:
+            return {name: self.frame(name, typed=typed) for name in names}
+        frames = {}
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # Largest blocks first so one big group does not finish last
+            futures = {}
+            for block in sorted(blocks, key=lambda b: b.start - b.end):
+                if self.path is not None:
+                    args = (self.path, block.start, block.end)
+                else:
+                    args = (self.content[block.start : block.end], None, None)
+                futures[block.name] = pool.submit(
+                    _parse_block, *args, block.name, self.encoding, typed
+                )
+            for name in names:
+                frames[name], issues = futures[name].result()
+                # Worker line numbers count from the start of its block
+                offset = self.blocks[name].start_row
+                for found in issues:
+                    found["line"] += offset
+                self.row_issues[name] = issues
+        return frames
+
+
+class AgsTables(Mapping):
+    """Read-only mapping of group name to DataFrame, built on first access.
+
+    Every group in the file is listed, but a group is only tokenized when it
+    is looked up; the resulting DataFrame is cached and returned as-is on later
+    lookups. Groups named in ``required`` are always present, as empty frames
+    if the file does not contain them.
+    """
+
+    def __init__(self, index, required=()):
+        self.index = index
+        self._names = list(index) + [g for g in required if g not in index]
+        self._frames = {}
+
+    def __getitem__(self, group_name):
+        frame = self._frames.get(group_name)
+        if frame is None:
+            if group_name not in self._names:
+                raise KeyError(group_name)
+            frame = self._frames[group_name] = self.index.frame(group_name)
+        return frame
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def loaded(self):
+        """Names of the groups materialized so far."""
+        return list(self._frames)
+
+    def issues(self):
+        """Scan findings plus those of the groups materialized so far.
+
+        Only loaded groups count, so the result is the same whether the
+        index is a fresh AgsIndex or a cached one.
+        """
+        return self.index.issues(self.loaded())
+
+    def load(self, groups=None, jobs=None):
+        """Materialize ``groups`` (default: all) at once, see AgsIndex.frames."""
+        names = list(self._names if groups is None else groups)
+        for name in names:
+            if name not in self._names:
+                raise KeyError(name)
+        missing = [g for g in names if g not in self._frames]
+        if missing:
+            parsed = self.index.frames(missing, jobs=jobs)
+            for name in missing:
+                # Required groups absent from the file come back as empty frames
+                frame = parsed.get(name)
+                self._frames[name] = (
+                    frame if frame is not None else self.index.frame(name)
+                )
+        return {name: self._frames[name] for name in names}
+
+    def __repr__(self):
+        return f"AgsTables({len(self._names)} groups, loaded={self.loaded()})"
+
+
+DEFAULT_GROUPS = ("GEOL", "LOCA", "ABBR")
+
+
+def _read_block(lines):
+    headings, units, types, data = [], [], [], []
+    for row in csv.reader(lines, delimiter=",", quotechar='"'):
+        if not row:
             continue
-        if in_group and row and row[0] == "DATA":
+        if row[0] == "DATA":
             data.append(row[1 : len(headings) + 1])
-            continue
-        if (
-            in_group
-            and row
-            and row[0] == "GROUP"
-            and (len(row) < 2 or row[1] != group_name)
-        ):
-            break
-    df = pd.DataFrame(data, columns=headings)
-    return df
+        elif row[0] == "HEADING":
+            headings = row[1:]
+        elif row[0] == "UNIT":
+            units = row[1:]
+        elif row[0] == "TYPE":
+            types = row[1:]
+    return headings, units, types, data
+
+
+def _iter_stream_blocks(stream, groups, encoding):
+    # Only the lines of the group currently being read are held in memory,
+    # and nothing at all is kept for groups that were not asked for
+    seen = set()
+    name, lines, keep = None, [], False
+    for raw in stream:
+        line = raw.decode(encoding).rstrip("\r\n")
+        match = _DESCRIPTOR_RE.match(line)
+        if match and match.group(1) == "GROUP":
+            if keep:
+                yield name, lines
+                if groups is not None and groups <= seen:
+                    return
+            fields = _parse_line(line)
+            name = fields[1] if len(fields) > 1 else ""
+            keep = name not in seen and (groups is None or name in groups)
+            seen.add(name)
+            lines = []
+        elif keep:
+            lines.append(line)
+    if keep:
+        yield name, lines
+
+
+def iter_ags_groups(source, groups=None, encoding="utf-8", typed=True):
+    """Yield ``(group_name, DataFrame)`` pairs in file order.
+
+    ``source`` is a path, which is indexed through mmap, or a binary file-like
+    object, which is read line by line. ``groups`` limits the output to the
+    named groups; other groups are skipped without being tokenized.
+    """
+    if groups is not None:
+        groups = set(groups)
+    if isinstance(source, (str, os.PathLike)):
+        index = AgsIndex.from_path(source, encoding)
+        for name in index:
+            if groups is None or name in groups:
+                yield name, index.frame(name, typed=typed)
+        return
+    for name, lines in _iter_stream_blocks(source, groups, encoding):
+        headings, units, types, rows = _read_block(lines)
+        yield name, build_frame(headings, rows, units, types, typed=typed)
+
+
+def parse_group(content, group_name):
+    return AgsIndex(content).frame(group_name)
+
 
+def load_ags_tables(ags_content, required=DEFAULT_GROUPS):
+    """Lazily load the groups of an AGS file.
 
-def load_ags_tables(ags_content):
-    geol = parse_group(ags_content, "GEOL")
-    loca = parse_group(ags_content, "LOCA")
-    abbr = parse_group(ags_content, "ABBR")
-    return {"GEOL": geol, "LOCA": loca, "ABBR": abbr}
+    ``ags_content`` may be the decoded text, the raw bytes, a path-like object
+    (mmap'd) or a binary file-like object such as a Streamlit upload.
+    """
+    if isinstance(ags_content, os.PathLike):
+        index = AgsIndex.from_path(ags_content)
+    elif hasattr(ags_content, "getvalue"):
+        index = AgsIndex(ags_content.getvalue())
+    elif hasattr(ags_content, "read"):
+        index = AgsIndex(ags_content.read())
+    else:
+        index = AgsIndex(ags_content)
+    return AgsTables(index, required=required)
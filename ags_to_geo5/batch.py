@@ -0,0 +1,206 @@
+import glob
+import io
+import os
+import pathlib
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .ags_parser import DEFAULT_GROUPS, load_ags_tables
+from .exporter import FIELDTEST_TYPE, export
+from .incremental import ExportState
+from .profiling import StageTimer, stage
+from .validation import raise_for_errors, validate_tables
+
+AGS_PATTERN = "*.[aA][gG][sS]"
+
+
+def collect_inputs(inputs, pattern=AGS_PATTERN, recursive=False):
+    """Expand files, directories and glob patterns into a list of AGS files."""
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            parts = [item, "**", pattern] if recursive else [item, pattern]
+            matches = sorted(glob.glob(os.path.join(*parts), recursive=recursive))
+        elif glob.has_magic(item):
+            matches = sorted(glob.glob(item, recursive=True))
+        else:
+            matches = [item]
+        files.extend(matches)
+    return list(dict.fromkeys(files))
+
+
+def output_path_for(ags_path, output_dir=None, suffix=".xlsx"):
+    name = os.path.splitext(os.path.basename(ags_path))[0] + suffix
+    return os.path.join(output_dir or os.path.dirname(ags_path), name)
+
+
+def load_tables(ags_source, cache_dir=None, timer=None, parse_jobs=1, issues=None):
+    """Load and materialize the GEOL, LOCA and ABBR tables of one AGS source.
+
+    ``ags_source`` is anything ags_parser.load_ags_tables accepts; a path is
+    read through the parsed-table cache when ``cache_dir`` is given. Large
+    files are parsed on ``parse_jobs`` processes (see AgsIndex.frames).
+    Pass a list as ``issues`` to validate the tables as part of the parse:
+    every finding is appended to it (see validation.issue) and a
+    validation.ValidationError is raised if any of them is an error.
+    """
+    with stage(timer, "parse"):
+        if cache_dir is None:
+            tables = load_ags_tables(ags_source)
+        else:
+            # Imported here so pyarrow is only needed when the cache is used
+            from .table_cache import TableCache
+
+            tables = TableCache(cache_dir).load_ags_tables(ags_source)
+        loaded = tables.load(DEFAULT_GROUPS, jobs=parse_jobs)
+        if issues is not None:
+            issues.extend(
+                validate_tables(
+                    tables.issues(), loaded["GEOL"], loaded["LOCA"], tables.index
+                )
+            )
+            raise_for_errors(issues)
+        return loaded["GEOL"], loaded["LOCA"], loaded["ABBR"]
+
+
+def convert_file(
+    ags_path,
+    template_path,
+    output_path,
+    cache_dir=None,
+    profile=False,
+    trace_memory=False,
+    state_path=None,
+    parse_jobs=1,
+    palette=None,
+    site=None,
+    grouping="merged",
+    test_type=FIELDTEST_TYPE,
+    classify=False,
+    validate=False,
+    output_format="xlsx",
+):
+    """Convert one AGS file, returning a result dict instead of raising.
+
+    The result carries per-stage ``timings`` (see profiling.StageTimer);
+    ``profile`` and ``trace_memory`` add cProfile and tracemalloc data.
+    With ``state_path`` the export is incremental against the saved
+    incremental.ExportState, which is then updated, and the result also
+    carries the per-borehole ``changes``. ``palette`` (a
+    palette.SoilPalette), ``site`` (a spatial.SiteFilter), ``grouping``,
+    ``test_type`` and ``classify`` are passed on to exporter.export. With
+    ``validate`` the result lists the validation ``issues`` and a file with
+    errors fails before the template is opened. With a table ``output_format`` (see
+    exporter.TABLE_FORMATS) ``output_path`` is the prefix of the table
+    files, which the result lists as ``files``.
+    """
+    timer = StageTimer(profile=profile, trace_memory=trace_memory)
+    start = time.perf_counter()
+    result = {"file": ags_path, "output": output_path, "error": None}
+    if validate:
+        result["issues"] = []
+    try:
+        df_geol, df_loca, df_abbr = load_tables(
+            pathlib.Path(ags_path), cache_dir, timer, parse_jobs, result.get("issues")
+        )
+        state = ExportState.load(state_path) if state_path else None
+        written = export(
+            df_geol,
+            df_loca,
+            df_abbr,
+            template_path,
+            output_path,
+            output_format,
+            timer=timer,
+            state=state,
+            palette=palette,
+            site=site,
+            grouping=grouping,
+            test_type=test_type,
+            classify=classify,
+        )
+        if output_format != "xlsx":
+            result["files"] = written
+        if state is not None:
+            state.save(state_path)
+            result["changes"] = state.changes
+    except Exception as exc:
+        result["output"] = None
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    result["seconds"] = time.perf_counter() - start
+    result["timings"] = timer.to_dict()
+    return result
+
+
+def convert_bytes(
+    ags_data, template_path, timer=None, validate=False, output_format="xlsx", **options
+):
+    """Convert in-memory AGS content (bytes or text) to workbook bytes.
+
+    Keyword ``options`` (``palette``, ``site``, ...) go to exporter.export.
+    With ``validate`` a file with errors raises validation.ValidationError
+    before the template is opened. A table ``output_format`` returns
+    ``{file_name: bytes}`` instead, see exporter.export_tables.
+    """
+    issues = [] if validate else None
+    df_geol, df_loca, df_abbr = load_tables(ags_data, timer=timer, issues=issues)
+    return export(
+        df_geol,
+        df_loca,
+        df_abbr,
+        template_path,
+        output_format=output_format,
+        timer=timer,
+        **options,
+    )
+
+
+def zip_outputs(outputs):
+    """Pack ``{member_name: bytes}`` into a ZIP archive built in memory."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in outputs.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def unzip_outputs(data):
+    """Inverse of zip_outputs: ``{member_name: bytes}`` of a ZIP archive."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {name: zf.read(name) for name in zf.namelist()}
+
+
+def convert_batch(files, template_path, output_dir=None, jobs=None, **options):
+    """Convert ``files`` across a process pool, yielding results as they finish.
+
+    ``jobs`` is the pool size (default: one per CPU); ``jobs=1`` converts in
+    this process. Other keyword ``options`` (``cache_dir``, ``profile``,
+    ``trace_memory``, ``state_path``, ``parse_jobs``, ``palette``,
+    ``site``, ``grouping``, ``test_type``, ``classify``, ``validate``,
+    ``output_format``) are passed on to convert_file. A failing file produces
+    a result with ``error`` set and never stops the rest of the batch.
+    """
+    template_path = os.path.abspath(template_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    # Table formats write several files, named from a suffix-less prefix
+    suffix = ".xlsx" if options.get("output_format", "xlsx") == "xlsx" else ""
+    tasks = [(f, template_path, output_path_for(f, output_dir, suffix)) for f in files]
+    if jobs == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield convert_file(*task, **options)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(convert_file, *task, **options): task for task in tasks}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as exc:
+                # The worker itself died (e.g. killed); report it like any failure
+                yield {
+                    "file": futures[future][0],
+                    "output": None,
+                    "error": f"{type(exc).__name__}: {exc}",
+                    "seconds": None,
+                }
@@ -0,0 +1,70 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from .xlsx_writer import load_template
+
+
+def conversion_key(ags_data, template_path, *options):
+    """Cache key for one conversion: AGS content hash + template version.
+
+    Any extra ``options`` that change the output (formats, filters, ...) are
+    appended to the key as-is, so they must be hashable.
+    """
+    if isinstance(ags_data, str):
+        ags_data = ags_data.encode("utf-8")
+    return (
+        hashlib.sha256(ags_data).hexdigest(),
+        load_template(template_path).digest,
+    ) + tuple(options)
+
+
+class ResultCache:
+    """Thread-safe LRU of conversion outputs, bounded by entry count and bytes.
+
+    Values are the generated file contents as ``bytes``; a value larger than
+    ``max_bytes`` on its own is never stored.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=64):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes or len(self._items) > self.max_entries:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Upper-cased GEOL_LEG value (or ABBR_DESC of a GEOL_LEG code) -> soil class
+SOIL_CLASSES = {
+    "CLAY": "Clay, fine grained",
+    "SAND": "Sand, coarse grained",
+    "SILT": "Silt",
+    "GRAVEL": "Gravel",
+}
+
+
+def _by_category(values, func):
+    # Transform the distinct values only and broadcast them back through the
+    # factorized codes, so the cost follows the number of distinct values
+    values = pd.Series(values, dtype=object)
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.asarray(func(pd.Series(uniques, dtype=object)), dtype=object)
+    return pd.Series(mapped[codes], index=values.index, dtype=object)
+
+
+def classification_table(df_abbr=None, extra=None):
+    """Soil class lookup keyed by upper-cased GEOL_LEG value.
+
+    Starts from SOIL_CLASSES, updated with ``extra`` (a dict, or the path of
+    a JSON object file). With ``df_abbr`` each GEOL_LEG abbreviation code is
+    also mapped through its ABBR_DESC, so numeric codes such as "201" whose
+    description is "CLAY" classify like "CLAY" itself.
+    """
+    if isinstance(extra, str):
+        with open(extra, encoding="utf-8") as f:
+            extra = json.load(f)
+    table = {str(k).upper(): v for k, v in {**SOIL_CLASSES, **(extra or {})}.items()}
+    if df_abbr is not None and {"ABBR_HDNG", "ABBR_CODE", "ABBR_DESC"} <= set(
+        df_abbr.columns
+    ):
+        legs = df_abbr[df_abbr["ABBR_HDNG"].astype(object) == "GEOL_LEG"]
+        for code, desc in zip(legs["ABBR_CODE"], legs["ABBR_DESC"]):
+            soil = table.get(str(desc).strip().upper())
+            if soil is not None:
+                table.setdefault(str(code).upper(), soil)
+    return table
+
+
+def classify_soils(legs, table=None):
+    """Soil classification of every GEOL_LEG value ("" when unknown)."""
+    if table is None:
+        table = SOIL_CLASSES
+    return _by_category(legs, lambda v: v.astype(str).str.upper().map(table).fillna(""))
@@ -1,145 +1,471 @@
+import io
+import numpy as np
 import pandas as pd
-import re
 from openpyxl import load_workbook
 from openpyxl.styles import PatternFill
+from .classify import classification_table, classify_soils
+from .palette import positional_colors
+from .profiling import stage
+from .xlsx_writer import load_template, write_template_sheets
 
 
-def extract_layer_name(desc):
-    regex = re.compile(r"^([A-Z]+(?:\s+[A-Z]+)*)")
-    match = regex.match(str(desc))
-    return match.group(1).strip() if match and len(match.group(1)) > 1 else ""
+def ensure_numeric(df, columns):
+    # Tables from load_ags_tables are already typed from the AGS TYPE row, so
+    # only untyped (text) columns still need coercing here
+    for col in columns:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
 
 
-def auto_classify(geol_leg):
-    soil_map = {
-        "CLAY": "Clay, fine grained",
-        "SAND": "Sand, coarse grained",
-        "SILT": "Silt",
-        "GRAVEL": "Gravel",
-        # Add more mappings as needed
+LAYER_COLUMNS = ["borehole_id", "thickness", "soil_name", "desc", "color"]
+
+
+def build_layer_table(df_geol, df_abbr, palette=None):
+    """One row per (LOCA_ID, GEOL_LEG) layer, computed in a single groupby.
+
+    Thickness is max(GEOL_BASE) - min(GEOL_TOP) over the layer, descriptions
+    are joined with "; ", the soil name comes from the first ABBR row whose
+    ABBR_CODE matches GEOL_LEG and the colour is picked from the layer's
+    position within its borehole, unless a palette.SoilPalette gives its
+    GEOL_LEG a fixed colour.
+    """
+    if "LOCA_ID" not in df_geol.columns or "GEOL_LEG" not in df_geol.columns:
+        return pd.DataFrame(columns=LAYER_COLUMNS)
+    keys = [df_geol["LOCA_ID"], df_geol["GEOL_LEG"]]
+    grouped = df_geol.groupby(keys, observed=True, sort=True)
+    index = grouped.size().index
+    if len(index) == 0:
+        return pd.DataFrame(columns=LAYER_COLUMNS)
+    layers = pd.DataFrame({"borehole_id": index.get_level_values(0)}, index=index)
+    if "GEOL_TOP" in df_geol.columns and "GEOL_BASE" in df_geol.columns:
+        layers["thickness"] = grouped["GEOL_BASE"].max() - grouped["GEOL_TOP"].min()
+    else:
+        layers["thickness"] = None
+    if "GEOL_DESC" in df_geol.columns:
+        # Join descriptions from contiguous runs of the sorted group ids rather
+        # than a per-group Series aggregation
+        group_ids = grouped.ngroup().to_numpy()
+        kept = group_ids >= 0
+        order = np.argsort(group_ids[kept], kind="stable")
+        desc = df_geol["GEOL_DESC"].astype(str).to_numpy(dtype=object)[kept][order]
+        bounds = np.flatnonzero(np.diff(group_ids[kept][order])) + 1
+        layers["desc"] = ["; ".join(chunk) for chunk in np.split(desc, bounds)]
+    else:
+        layers["desc"] = ""
+
+    # Soil name from ABBR_DESC, resolved through one hash lookup per layer
+    legs = pd.Series(index.get_level_values(1), index=index, dtype=object)
+    layers["soil_name"] = legs
+    if (
+        df_abbr is not None
+        and "ABBR_CODE" in df_abbr.columns
+        and "ABBR_DESC" in df_abbr.columns
+    ):
+        abbr = df_abbr.drop_duplicates("ABBR_CODE")
+        lookup = dict(zip(abbr["ABBR_CODE"].astype(str), abbr["ABBR_DESC"]))
+        names = legs.astype(str).map(lookup)
+        layers["soil_name"] = names.where(names.notna(), legs)
+
+    # Colour depends only on (position, layer count) within each borehole
+    by_hole = layers.groupby(level=0, sort=False)
+    position = by_hole.cumcount().to_numpy()
+    count = by_hole["borehole_id"].transform("size").to_numpy()
+    colors = positional_colors(position, count)
+    if palette is not None:
+        colors = palette.apply(legs, colors)
+    layers["color"] = colors
+    return layers[LAYER_COLUMNS].reset_index(drop=True)
+
+
+def build_row_layer_table(df_geol, df_abbr=None, palette=None):
+    """One row per GEOL row, boreholes sorted by LOCA_ID and rows in file order.
+
+    Thickness is GEOL_BASE - GEOL_TOP, the soil name is the raw GEOL_LEG and
+    the colour follows the row's position within its borehole, as in
+    build_layer_table. ``df_abbr`` is not used.
+    """
+    if "LOCA_ID" not in df_geol.columns or "GEOL_LEG" not in df_geol.columns:
+        return pd.DataFrame(columns=LAYER_COLUMNS)
+    rows = df_geol[df_geol["LOCA_ID"].notna()]
+    rows = rows.sort_values("LOCA_ID", kind="stable")
+    if rows.empty:
+        return pd.DataFrame(columns=LAYER_COLUMNS)
+    loca_id = rows["LOCA_ID"].astype(object)
+    layers = pd.DataFrame({"borehole_id": loca_id.to_numpy()})
+    if "GEOL_TOP" in rows.columns and "GEOL_BASE" in rows.columns:
+        layers["thickness"] = (rows["GEOL_BASE"] - rows["GEOL_TOP"]).to_numpy()
+    else:
+        layers["thickness"] = None
+    legs = rows["GEOL_LEG"].astype(object).to_numpy()
+    layers["soil_name"] = legs
+    if "GEOL_DESC" in rows.columns:
+        layers["desc"] = rows["GEOL_DESC"].astype(object).to_numpy()
+    else:
+        layers["desc"] = ""
+    by_hole = layers.groupby("borehole_id", sort=False)
+    position = by_hole.cumcount().to_numpy()
+    count = by_hole["borehole_id"].transform("size").to_numpy()
+    colors = positional_colors(position, count)
+    if palette is not None:
+        colors = palette.apply(legs, colors)
+    layers["color"] = colors
+    return layers[LAYER_COLUMNS]
+
+
+# Layer-grouping strategies: name -> builder(df_geol, df_abbr, palette)
+LAYER_GROUPINGS = {"merged": build_layer_table, "per-row": build_row_layer_table}
+
+
+def layer_builder(grouping):
+    try:
+        return LAYER_GROUPINGS[grouping]
+    except KeyError:
+        choices = ", ".join(LAYER_GROUPINGS)
+        raise ValueError(f"unknown layer grouping {grouping!r} (use {choices})")
+
+
+def soil_classes(df_abbr, classify):
+    """Classification lookup for the ``classify`` option, or None when off.
+
+    ``classify`` is False (column left blank), True (classify.SOIL_CLASSES
+    through the file's ABBR codes) or extra classes as a dict or the path
+    of a JSON file, see classify.classification_table.
+    """
+    if not classify:
+        return None
+    return classification_table(df_abbr, None if classify is True else classify)
+
+
+def layer_table(df_geol, df_abbr, palette=None, grouping="merged", classes=None):
+    """Layers table built by the ``grouping`` strategy.
+
+    With ``classes`` (see soil_classes) each layer's soil name is classified
+    into the "Classification according to EN ISO 14688-1" column.
+    """
+    layers = layer_builder(grouping)(df_geol, df_abbr, palette)
+    if classes is not None:
+        layers["classification"] = classify_soils(
+            layers["soil_name"], classes
+        ).to_numpy()
+    return layers
+
+
+FIELDTEST_TYPE = "EN - Standard : Borehole"
+LOCAL_FIELDTEST_TYPE = "(local set) : Borehole"
+# Test-type strategies: name -> GEO5 field test template
+TEST_TYPES = {"standard": FIELDTEST_TYPE, "local": LOCAL_FIELDTEST_TYPE}
+
+
+def build_fieldtest_table(df_loca, test_type=FIELDTEST_TYPE):
+    """FieldTests sheet columns, one row per LOCA hole."""
+    n = len(df_loca)
+    blank = pd.Series([""] * n, index=df_loca.index, dtype=object)
+    loca_id = df_loca["LOCA_ID"] if "LOCA_ID" in df_loca.columns else blank
+    coords = {
+        col: df_loca[col] if col in df_loca.columns else blank
+        for col in ["LOCA_NATN", "LOCA_NATE", "LOCA_GL"]
     }
-    return soil_map.get(str(geol_leg).upper(), "")
+    # Skip rows with neither a LOCA_ID nor any coordinate
+    has_coords = pd.Series(False, index=df_loca.index)
+    for col in coords:
+        if col in df_loca.columns:
+            has_coords |= df_loca[col].notna()
+    keep = (loca_id.notna() & (loca_id != "")) | has_coords
+    table = pd.DataFrame(
+        {
+            "name": loca_id,
+            "template": test_type,
+            "x": coords["LOCA_NATN"],
+            "y": coords["LOCA_NATE"],
+            "elevation": "input",
+            "z": coords["LOCA_GL"],
+        }
+    )
+    return table[keep].reset_index(drop=True)
+
+
+def layer_columns(layers):
+    """Column arrays for the Layers sheet, in template order."""
+    n = len(layers)
+    return [
+        layers["borehole_id"].tolist(),
+        layers["thickness"].tolist(),
+        layers["soil_name"].tolist(),
+        ["GEO_CLAY"] * n,
+        layers["color"].tolist(),
+        ["clDefault"] * n,
+        [50] * n,
+        layers["desc"].tolist(),
+        (
+            layers["classification"].tolist()
+            if "classification" in layers.columns
+            else [""] * n
+        ),
+    ]
+
+
+def fieldtest_columns(fieldtests):
+    """Column arrays for the FieldTests sheet, in template order."""
+    return [fieldtests[col].tolist() for col in fieldtests.columns]
 
 
-def export_to_excel(df_geol, df_loca, df_abbr, template_path, output_path):
+def sheet_columns(fieldtests, layers):
+    """Column arrays for the FieldTests and Layers sheets, in template order."""
+    return {
+        "FieldTests": fieldtest_columns(fieldtests),
+        "Layers": layer_columns(layers),
+    }
+
+
+def _transform(
+    df_geol,
+    df_loca,
+    df_abbr,
+    timer=None,
+    state=None,
+    palette=None,
+    site=None,
+    grouping="merged",
+    test_type=FIELDTEST_TYPE,
+    classify=False,
+):
+    # Coerce and transform stages shared by every output format. An unknown
+    # grouping fails here, before any work is done
+    layer_builder(grouping)
     # Prepare data
     # Ensure numeric columns for all possible top/base naming conventions
-    for col in ["GEOL_TOP", "GEOL_BASE", "GEOL_DEPTH"]:
-        if col in df_geol.columns:
-            df_geol[col] = pd.to_numeric(df_geol[col], errors="coerce")
-    for col in ["LOCA_NATE", "LOCA_NATN", "LOCA_GL"]:
-        if col in df_loca.columns:
-            df_loca[col] = pd.to_numeric(df_loca[col], errors="coerce")
-    # Write to Excel
-    wb = load_workbook(template_path)
-    ws_fieldtests = wb["FieldTests"]
-    ws_layers = wb["Layers"]
-    ws_fieldtests.delete_rows(2, ws_fieldtests.max_row)
-    row_idx = 2
-    for i, row in df_loca.iterrows():
-        # Only write rows with a LOCA_ID and at least one coordinate
-        if (
-            not row.get("LOCA_ID", "")
-            and pd.isna(row.get("LOCA_NATN", None))
-            and pd.isna(row.get("LOCA_NATE", None))
-            and pd.isna(row.get("LOCA_GL", None))
-        ):
-            continue
-        ws_fieldtests.cell(row=row_idx, column=1, value=row.get("LOCA_ID", ""))
-        ws_fieldtests.cell(row=row_idx, column=2, value="EN - Standard : Borehole")
-        ws_fieldtests.cell(row=row_idx, column=3, value=row.get("LOCA_NATN", ""))
-        ws_fieldtests.cell(row=row_idx, column=4, value=row.get("LOCA_NATE", ""))
-        ws_fieldtests.cell(row=row_idx, column=5, value="input")
-        ws_fieldtests.cell(row=row_idx, column=6, value=row.get("LOCA_GL", ""))
-        row_idx += 1
-    ws_layers.delete_rows(2, ws_layers.max_row)
-    layer_row = 2
-
-    # Group by LOCA_ID, then assign color logic per borehole
-    def to_hex2(val):
-        return format(int(val), "02X")
-
-    def assign_colors(count_groups):
-        # Pastel pink: RGB(255, 209, 220) -> BGR: (220, 209, 255)
-        # Pastel yellow: RGB(255, 229, 180) -> BGR: (180, 229, 255)
-        colors = []
-        if count_groups == 1:
-            colors.append("$808080")
-            return colors
-        for i in range(count_groups):
-            if i == 0:
-                color_hex = "$808080"  # Top layer: grey
-            elif i == count_groups - 1:
-                color_hex = "$B4E5FF"  # Bottom layer: pastel yellow (BGR)
+    with stage(timer, "coerce"):
+        ensure_numeric(df_geol, ["GEOL_TOP", "GEOL_BASE", "GEOL_DEPTH"])
+        ensure_numeric(df_loca, ["LOCA_NATE", "LOCA_NATN", "LOCA_GL"])
+    with stage(timer, "transform"):
+        if site is not None:
+            df_geol, df_loca = site.apply(df_geol, df_loca)
+        fieldtests = build_fieldtest_table(df_loca, test_type)
+        classes = soil_classes(df_abbr, classify)
+        if state is None:
+            layers = layer_table(df_geol, df_abbr, palette, grouping, classes)
+            return sheet_columns(fieldtests, layers)
+        # Layers rows come pre-serialized, reused for unchanged boreholes
+        return {
+            "FieldTests": fieldtest_columns(fieldtests),
+            "Layers": state.layer_rows(
+                df_geol, df_loca, df_abbr, palette, grouping, classes
+            ),
+        }
+
+
+def export_to_excel(
+    df_geol,
+    df_loca,
+    df_abbr,
+    template_path,
+    output_path=None,
+    bulk=True,
+    timer=None,
+    state=None,
+    palette=None,
+    site=None,
+    grouping="merged",
+    test_type=FIELDTEST_TYPE,
+    classify=False,
+):
+    """Fill the GEO5 template's FieldTests and Layers sheets.
+
+    ``output_path`` may be a filename or any writable binary stream (such as
+    ``io.BytesIO``). When it is omitted the workbook is built entirely in
+    memory and returned as ``bytes``. Pass a profiling.StageTimer as
+    ``timer`` to record the coerce/transform/write stages, and an
+    incremental.ExportState as ``state`` to reuse the Layers rows of
+    boreholes unchanged since the previous export (see ``state.changes``).
+    ``palette`` is an optional palette.SoilPalette of colours per GEOL_LEG
+    and ``site`` a spatial.SiteFilter restricting the export to some holes.
+
+    This is the one conversion engine behind the app, the CLI and the
+    scripts. ``grouping`` picks the Layers strategy from LAYER_GROUPINGS
+    ("merged" by GEOL_LEG, or "per-row") and ``test_type`` the FieldTests
+    template name (see TEST_TYPES). ``classify`` fills the EN ISO 14688-1
+    classification column of Layers, see soil_classes.
+    """
+    if output_path is None:
+        buffer = io.BytesIO()
+        export_to_excel(
+            df_geol,
+            df_loca,
+            df_abbr,
+            template_path,
+            buffer,
+            bulk=bulk,
+            timer=timer,
+            state=state,
+            palette=palette,
+            site=site,
+            grouping=grouping,
+            test_type=test_type,
+            classify=classify,
+        )
+        return buffer.getvalue()
+    if state is not None and not bulk:
+        raise ValueError("incremental export needs the bulk writer")
+    columns = _transform(
+        df_geol,
+        df_loca,
+        df_abbr,
+        timer=timer,
+        state=state,
+        palette=palette,
+        site=site,
+        grouping=grouping,
+        test_type=test_type,
+        classify=classify,
+    )
+    with stage(timer, "write"):
+        if bulk:
+            # Rewrite only the two sheets' XML inside a copy of the template
+            write_template_sheets(template_path, output_path, columns)
+            return
+        # Write to Excel, parsing the cached template bytes rather than the file
+        wb = load_workbook(io.BytesIO(load_template(template_path).data))
+        for sheet_name, sheet_cols in columns.items():
+            ws = wb[sheet_name]
+            ws.delete_rows(2, ws.max_row)
+            for row in zip(*sheet_cols):
+                ws.append(row)
+        wb.save(output_path)
+
+
+# Header rows of the template's FieldTests and Layers sheets, used by the
+# table formats below
+SHEET_HEADERS = {
+    "FieldTests": [
+        "Test name",
+        "Template",
+        "Coordinate X",
+        "Coordinate Y",
+        "Elevation",
+        "Coordinate Z",
+    ],
+    "Layers": [
+        "Test name",
+        "Thickness",
+        "Soil name",
+        "Soil pattern|Pattern",
+        "Soil pattern|Color",
+        "Soil pattern|Background",
+        "Soil pattern|Saturation",
+        "Layer description",
+        "Data - Basic|Classification according to EN ISO 14688-1",
+    ],
+}
+
+
+def _write_csv(frame, stream):
+    # Same 16 significant digits as the XLSX writer, so 2.35 stays 2.35
+    frame.to_csv(stream, index=False, encoding="utf-8", float_format="%.16g")
+
+
+def _write_jsonl(frame, stream):
+    stream.write(
+        frame.to_json(orient="records", lines=True, force_ascii=False).encode("utf-8")
+    )
+
+
+def _write_parquet(frame, stream):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as exc:
+        raise ImportError("Parquet output needs pyarrow: pip install pyarrow") from exc
+    frame.to_parquet(stream, index=False)
+
+
+# Table output formats: name -> (file extension, writer(frame, binary stream))
+TABLE_FORMATS = {
+    "csv": (".csv", _write_csv),
+    "parquet": (".parquet", _write_parquet),
+    "jsonl": (".jsonl", _write_jsonl),
+}
+OUTPUT_FORMATS = ("xlsx",) + tuple(TABLE_FORMATS)
+
+
+def sheet_frame(sheet_name, columns):
+    """DataFrame of one sheet's column arrays under the template headers."""
+    return pd.DataFrame(dict(zip(SHEET_HEADERS[sheet_name], columns)))
+
+
+def export_tables(
+    df_geol,
+    df_loca,
+    df_abbr,
+    output_path=None,
+    output_format="csv",
+    timer=None,
+    palette=None,
+    site=None,
+    grouping="merged",
+    test_type=FIELDTEST_TYPE,
+    classify=False,
+):
+    """Write the FieldTests and Layers tables as CSV, Parquet or JSON lines.
+
+    The tables are the ones export_to_excel puts in the template, written
+    straight from the column arrays with no workbook involved. Each table
+    goes to ``f"{output_path}_{sheet}{extension}"`` and the paths written
+    are returned; without ``output_path`` the result is
+    ``{"FieldTests.csv": bytes, "Layers.csv": bytes}`` (or .parquet/.jsonl).
+    """
+    if output_format not in TABLE_FORMATS:
+        choices = ", ".join(TABLE_FORMATS)
+        raise ValueError(f"unknown table format {output_format!r} (use {choices})")
+    extension, writer = TABLE_FORMATS[output_format]
+    columns = _transform(
+        df_geol,
+        df_loca,
+        df_abbr,
+        timer=timer,
+        palette=palette,
+        site=site,
+        grouping=grouping,
+        test_type=test_type,
+        classify=classify,
+    )
+    outputs = {}
+    with stage(timer, "write"):
+        for sheet_name, sheet_cols in columns.items():
+            frame = sheet_frame(sheet_name, sheet_cols)
+            if output_path is None:
+                buffer = io.BytesIO()
+                writer(frame, buffer)
+                outputs[sheet_name + extension] = buffer.getvalue()
             else:
-                nIntermediate = count_groups - 2
-                j = i - 1
-                if nIntermediate > 1:
-                    f = j / (nIntermediate)
-                else:
-                    f = 0
-                R = 255
-                G = round(209 + f * (229 - 209))
-                B = round(220 + f * (180 - 220))
-                color_hex = "$" + to_hex2(B) + to_hex2(G) + to_hex2(R)
-            colors.append(color_hex)
-        return colors
-
-    if "LOCA_ID" in df_geol.columns and "GEOL_LEG" in df_geol.columns:
-        for borehole_id, bh_data in df_geol.groupby("LOCA_ID"):
-            # Each row in bh_data is a layer
-            layers = []
-            for leg, layer_data in bh_data.groupby("GEOL_LEG"):
-                start_depth = (
-                    layer_data["GEOL_TOP"].min()
-                    if "GEOL_TOP" in layer_data.columns
-                    else None
-                )
-                end_depth = (
-                    layer_data["GEOL_BASE"].max()
-                    if "GEOL_BASE" in layer_data.columns
-                    else None
-                )
-                thickness = (
-                    end_depth - start_depth
-                    if start_depth is not None and end_depth is not None
-                    else None
-                )
-                desc = "; ".join(
-                    layer_data.get("GEOL_DESC", pd.Series("")).astype(str).tolist()
-                )
-                # Soil name from ABBR_DESC
-                soil_name = leg
-                if (
-                    df_abbr is not None
-                    and "ABBR_CODE" in df_abbr.columns
-                    and "ABBR_DESC" in df_abbr.columns
-                ):
-                    abbr_match = df_abbr[df_abbr["ABBR_CODE"] == str(leg)]
-                    if not abbr_match.empty:
-                        soil_name = abbr_match["ABBR_DESC"].iloc[0]
-                layers.append(
-                    {
-                        "borehole_id": borehole_id,
-                        "thickness": thickness,
-                        "soil_name": soil_name,
-                        "desc": desc,
-                    }
-                )
-            colors = assign_colors(len(layers)) if layers else []
-            for idx, row in enumerate(layers):
-                ws_layers.cell(row=layer_row, column=1, value=row["borehole_id"])
-                ws_layers.cell(row=layer_row, column=2, value=row["thickness"])
-                ws_layers.cell(row=layer_row, column=3, value=row["soil_name"])
-                ws_layers.cell(row=layer_row, column=4, value="GEO_CLAY")
-                ws_layers.cell(
-                    row=layer_row,
-                    column=5,
-                    value=colors[idx] if idx < len(colors) else "",
-                )
-                ws_layers.cell(row=layer_row, column=6, value="clDefault")
-                ws_layers.cell(row=layer_row, column=7, value=50)
-                ws_layers.cell(row=layer_row, column=8, value=row["desc"])
-                ws_layers.cell(row=layer_row, column=9, value="")
-                layer_row += 1
-    wb.save(output_path)
+                path = f"{output_path}_{sheet_name}{extension}"
+                with open(path, "wb") as f:
+                    writer(frame, f)
+                outputs[sheet_name + extension] = path
+    if output_path is None:
+        return outputs
+    return list(outputs.values())
+
+
+def export(
+    df_geol,
+    df_loca,
+    df_abbr,
+    template_path,
+    output_path=None,
+    output_format="xlsx",
+    **options,
+):
+    """export_to_excel or export_tables, by ``output_format``.
+
+    For the table formats ``output_path`` is the prefix of the table files
+    and ``template_path`` is not used.
+    """
+    if output_format == "xlsx":
+        return export_to_excel(
+            df_geol, df_loca, df_abbr, template_path, output_path, **options
+        )
+    if options.get("state") is not None:
+        raise ValueError("incremental export only writes xlsx")
+    options.pop("state", None)
+    return export_tables(
+        df_geol, df_loca, df_abbr, output_path, output_format, **options
+    )
@@ -0,0 +1,151 @@
+import json
+import os
+
+import pandas as pd
+
+from .exporter import layer_columns, layer_table
+from .xlsx_writer import SheetRows, row_fragments
+
+# Incremental re-export: a revised AGS delivery usually changes only a few
+# boreholes. ExportState remembers, per LOCA_ID, a fingerprint of the GEOL and
+# LOCA values the export depends on plus the Layers sheet rows serialized for
+# it, so the next export only rebuilds and re-serializes the Layers rows of
+# added or changed boreholes. FieldTests (one row per hole) is always rebuilt.
+
+STATE_VERSION = 2
+GEOL_FIELDS = ["GEOL_TOP", "GEOL_BASE", "GEOL_LEG", "GEOL_DESC"]
+LOCA_FIELDS = ["LOCA_NATN", "LOCA_NATE", "LOCA_GL"]
+
+
+def _hole_hashes(df, fields):
+    """Order-sensitive 64-bit hash of each LOCA_ID's rows over ``fields``."""
+    if "LOCA_ID" not in df.columns or df.empty:
+        return pd.Series(dtype="uint64")
+    loca_id = df["LOCA_ID"].astype(object)
+    values = df[[c for c in fields if c in df.columns]].copy()
+    # The row's position within its hole makes the per-hole sum order-sensitive
+    values["_position"] = df.groupby(loca_id, sort=False).cumcount()
+    rows = pd.util.hash_pandas_object(values, index=False)
+    return rows.groupby(loca_id.to_numpy(), sort=False).sum()
+
+
+def borehole_fingerprints(df_geol, df_loca):
+    """``{LOCA_ID: "geol-hash:loca-hash"}`` for every hole in GEOL or LOCA.
+
+    A blank LOCA_ID is a hole like any other, as the layer builders group on it.
+    """
+    geol = _hole_hashes(df_geol, GEOL_FIELDS)
+    loca = _hole_hashes(df_loca, LOCA_FIELDS)
+    holes = dict.fromkeys(list(loca.index) + list(geol.index))
+    return {
+        str(hole): f"{geol.get(hole, 0):016x}:{loca.get(hole, 0):016x}"
+        for hole in holes
+    }
+
+
+def abbr_digest(df_abbr):
+    if df_abbr is None or "ABBR_CODE" not in df_abbr.columns:
+        return ""
+    columns = [c for c in ["ABBR_CODE", "ABBR_DESC"] if c in df_abbr.columns]
+    hashes = pd.util.hash_pandas_object(df_abbr[columns], index=True)
+    return f"{int(hashes.sum()):016x}:{len(hashes)}"
+
+
+class ExportState:
+    """Per-borehole fingerprints and Layers sheet rows from the previous export.
+
+    Pass an instance to ``export_to_excel(..., state=state)``; it is updated
+    in place and ``state.changes`` then reports what differed from the
+    previous run. Persist it between runs with ``save``/``load``.
+    """
+
+    def __init__(self):
+        self.context = None
+        self.fingerprints = {}
+        self.layers = {}
+        self.changes = None
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved state; a missing or outdated file gives an empty one."""
+        state = cls()
+        if not os.path.exists(path):
+            return state
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == STATE_VERSION:
+            state.context = data["context"]
+            state.fingerprints = data["fingerprints"]
+            state.layers = data["layers"]
+        return state
+
+    def save(self, path):
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": STATE_VERSION,
+                    "context": self.context,
+                    "fingerprints": self.fingerprints,
+                    "layers": self.layers,
+                },
+                f,
+            )
+        os.replace(tmp, path)
+
+    def layer_rows(
+        self, df_geol, df_loca, df_abbr, palette=None, grouping="merged", classes=None
+    ):
+        """Layers sheet rows, rebuilding only holes whose fingerprint changed.
+
+        ``classes`` is the classification lookup of exporter.soil_classes.
+        """
+        fingerprints = borehole_fingerprints(df_geol, df_loca)
+        # Soil names come from ABBR and colours from the palette, so changing
+        # either one (or the grouping or classification) invalidates every hole
+        context = abbr_digest(df_abbr)
+        if grouping != "merged":
+            context += "|" + grouping
+        if classes is not None:
+            context += "|" + json.dumps(classes, sort_keys=True)
+        if palette is not None:
+            context += "|" + palette.digest()
+        full_rebuild = context != self.context
+        # added/changed/removed always describe the data; a context change is
+        # only reported through full_rebuild
+        added = [h for h in fingerprints if h not in self.fingerprints]
+        changed = [
+            h
+            for h in fingerprints
+            if h in self.fingerprints and fingerprints[h] != self.fingerprints[h]
+        ]
+        removed = [h for h in self.fingerprints if h not in fingerprints]
+        stale = set(fingerprints) if full_rebuild else set(added) | set(changed)
+
+        if "LOCA_ID" in df_geol.columns:
+            rebuild = df_geol[df_geol["LOCA_ID"].astype(object).isin(stale)]
+        else:
+            rebuild = df_geol
+        fresh = layer_table(rebuild, df_abbr, palette, grouping, classes)
+        layers = {
+            hole: rows
+            for hole, rows in self.layers.items()
+            if hole in fingerprints and hole not in stale
+        }
+        fragments = row_fragments(layer_columns(fresh))
+        for hole, fragment in zip(fresh["borehole_id"].tolist(), fragments):
+            layers.setdefault(str(hole), []).append(fragment)
+
+        self.context = context
+        self.fingerprints = fingerprints
+        self.layers = layers
+        self.changes = {
+            "full_rebuild": full_rebuild,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "unchanged": len(fingerprints) - len(added) - len(changed),
+            "rebuilt_layers": len(fresh),
+        }
+        # Same row order as the layer builders: boreholes sorted by LOCA_ID
+        return SheetRows(row for hole in sorted(layers) for row in layers[hole])
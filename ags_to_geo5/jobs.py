@@ -0,0 +1,149 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .profiling import STAGES, StageTimer
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobTimer(StageTimer):
+    """StageTimer that reports progress and stops a cancelled job.
+
+    Cancellation is checked whenever a pipeline stage starts, so a running
+    conversion stops at its next stage boundary.
+    """
+
+    def __init__(self, job, **kwargs):
+        super().__init__(**kwargs)
+        self.job = job
+
+    def stage(self, name):
+        if self.job.cancel_requested:
+            raise JobCancelled(self.job.id)
+        self.job.stage = name
+        return super().stage(name)
+
+
+class Job:
+    """One submitted conversion; read its fields to poll for progress."""
+
+    def __init__(self, name):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = QUEUED
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.cancel_requested = False
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.timer = JobTimer(self)
+        self.future = None
+
+    @property
+    def progress(self):
+        """Fraction of the pipeline stages finished, from 0.0 to 1.0."""
+        if self.status == DONE:
+            return 1.0
+        done = {record["stage"] for record in self.timer.stages}
+        return len(done & set(STAGES)) / len(STAGES)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "error": self.error,
+            "queued_seconds": (self.started or time.time()) - self.submitted,
+            "timings": self.timer.to_dict(),
+        }
+
+
+class JobQueue:
+    """Background conversions on a bounded pool of worker threads.
+
+    ``submit`` returns a job ID immediately; at most ``max_workers`` jobs run
+    at once across every caller sharing the queue, the rest wait in FIFO
+    order. Finished jobs are kept for polling until ``forget`` is called,
+    with only the ``max_finished`` most recent ones retained.
+    """
+
+    def __init__(self, max_workers=4, max_finished=100):
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ags-job"
+        )
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, name, func, *args, **kwargs):
+        """Run ``func(*args, timer=job.timer, **kwargs)`` in the background."""
+        job = Job(name)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._pool.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job.status, job.finished = CANCELLED, time.time()
+            return
+        job.status, job.started = RUNNING, time.time()
+        try:
+            job.result = func(*args, timer=job.timer, **kwargs)
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as exc:
+            job.error = f"{type(exc).__name__}: {exc}"
+            job.status = FAILED
+        else:
+            job.status = DONE
+        job.finished = time.time()
+
+    def _prune(self):
+        finished = [j.id for j in self._jobs.values() if j.status in FINISHED]
+        for job_id in finished[: max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """The Job with this ID, or None if it is unknown or was forgotten."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or stop a running one at its next stage."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return False
+        job.cancel_requested = True
+        if job.future is not None and job.future.cancel():
+            job.status, job.finished = CANCELLED, time.time()
+        return True
+
+    def forget(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def active(self):
+        """Number of jobs queued or running."""
+        with self._lock:
+            return sum(j.status not in FINISHED for j in self._jobs.values())
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,103 @@
+import functools
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+# GEO5 colours are Delphi TColor strings: "$" followed by BGR hex digits.
+# By default a borehole's top layer is grey, its bottom layer pastel yellow
+# and the layers between run from pastel pink to pastel yellow.
+TOP_COLOR = "$808080"  # grey
+BOTTOM_COLOR = "$B4E5FF"  # pastel yellow, RGB(255, 229, 180)
+PINK_RGB = (255, 209, 220)
+YELLOW_RGB = (255, 229, 180)
+
+_BGR_RE = re.compile(r"^\$[0-9A-Fa-f]{6}$")
+_RGB_RE = re.compile(r"^#[0-9A-Fa-f]{6}$")
+
+
+def to_hex2(val):
+    return format(int(val), "02X")
+
+
+def _interpolated(f):
+    r, g, b = (round(a + f * (z - a)) for a, z in zip(PINK_RGB, YELLOW_RGB))
+    return "$" + to_hex2(b) + to_hex2(g) + to_hex2(r)
+
+
+@functools.lru_cache(maxsize=None)
+def layer_colors(count):
+    """Colours of a borehole's ``count`` layers, top to bottom (memoized)."""
+    if count == 1:
+        return (TOP_COLOR,)
+    colors = []
+    for i in range(count):
+        if i == 0:
+            colors.append(TOP_COLOR)
+        elif i == count - 1:
+            colors.append(BOTTOM_COLOR)
+        else:
+            intermediate = count - 2
+            colors.append(
+                _interpolated((i - 1) / intermediate if intermediate > 1 else 0)
+            )
+    return tuple(colors)
+
+
+def assign_colors(count_groups):
+    return list(layer_colors(count_groups))
+
+
+def positional_colors(position, count):
+    """Colour of every layer from its position and its borehole's layer count.
+
+    ``position`` and ``count`` are equal-length integer arrays. Each distinct
+    count's palette is concatenated into one lookup array, so the whole
+    column is resolved with a single fancy-indexing step.
+    """
+    position = np.asarray(position, dtype=np.intp)
+    count = np.asarray(count, dtype=np.intp)
+    if len(count) == 0:
+        return np.array([], dtype=object)
+    sizes = np.unique(count)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    lookup = np.array(
+        [color for n in sizes.tolist() for color in layer_colors(n)], dtype=object
+    )
+    return lookup[starts[np.searchsorted(sizes, count)] + position]
+
+
+def to_geo5_color(value):
+    """Normalize "$BBGGRR" or "#RRGGBB" to GEO5's "$BBGGRR" form."""
+    value = str(value).strip()
+    if _BGR_RE.match(value):
+        return value.upper()
+    if _RGB_RE.match(value):
+        return ("$" + value[5:7] + value[3:5] + value[1:3]).upper()
+    raise ValueError(f"not a colour: {value!r} (use '#RRGGBB' or '$BBGGRR')")
+
+
+class SoilPalette:
+    """Fixed layer colours per GEOL_LEG code.
+
+    Layers whose GEOL_LEG is not listed keep the positional colour. Colours
+    may be given as "#RRGGBB" or GEO5's "$BBGGRR".
+    """
+
+    def __init__(self, colors):
+        self.colors = {str(leg): to_geo5_color(c) for leg, c in colors.items()}
+
+    @classmethod
+    def from_json(cls, path):
+        """Load ``{"GEOL_LEG code": "colour", ...}`` from a JSON file."""
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def digest(self):
+        return json.dumps(self.colors, sort_keys=True)
+
+    def apply(self, legs, colors):
+        """Override ``colors`` wherever the matching leg has a fixed colour."""
+        fixed = pd.Series(legs, dtype=object).astype(str).map(self.colors)
+        return np.where(fixed.notna(), fixed.to_numpy(dtype=object), colors)
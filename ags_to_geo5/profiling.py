@@ -0,0 +1,89 @@
+import cProfile
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+# Pipeline stages, in the order a conversion runs them
+STAGES = ("parse", "coerce", "transform", "write")
+
+
+def _top_functions(profiler, limit):
+    stats = pstats.Stats(profiler).sort_stats("cumulative")
+    top = []
+    for func in stats.fcn_list[:limit]:
+        _, ncalls, tottime, cumtime, _ = stats.stats[func]
+        filename, line, name = func
+        top.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": ncalls,
+                "tottime": tottime,
+                "cumtime": cumtime,
+            }
+        )
+    return top
+
+
+class StageTimer:
+    """Per-stage wall-clock timings, with optional cProfile/tracemalloc hooks.
+
+    ``profile`` records the ``profile_limit`` most expensive functions of
+    each stage (by cumulative time); ``trace_memory`` records each stage's
+    peak traced allocation in bytes. Both only see the calling thread/process.
+    """
+
+    def __init__(self, profile=False, trace_memory=False, profile_limit=15):
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.profile_limit = profile_limit
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        record = {"stage": name}
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        profiler = cProfile.Profile() if self.profile else None
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+                record["profile"] = _top_functions(profiler, self.profile_limit)
+            if self.trace_memory:
+                record["peak_bytes"] = tracemalloc.get_traced_memory()[1] - baseline
+                if started_tracing:
+                    tracemalloc.stop()
+            self.stages.append(record)
+
+    def seconds(self):
+        """``{stage: seconds}``, summing repeated stages."""
+        totals = {}
+        for record in self.stages:
+            totals[record["stage"]] = totals.get(record["stage"], 0) + record["seconds"]
+        return totals
+
+    def to_dict(self):
+        return {
+            "total_seconds": sum(r["seconds"] for r in self.stages),
+            "stages": self.stages,
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+
+def stage(timer, name):
+    """``timer.stage(name)``, or a no-op when no timer is given."""
+    return timer.stage(name) if timer is not None else nullcontext()
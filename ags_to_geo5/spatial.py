@@ -0,0 +1,174 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Site subsets: LOCA holes are bucketed into a uniform grid on their easting
+# (LOCA_NATE) and northing (LOCA_NATN), so a bounding box, circle or polygon
+# only tests the points in the grid cells it overlaps.
+
+
+def _points_in_polygon(x, y, vertices):
+    # Even-odd ray casting, one numpy pass per polygon edge
+    inside = np.zeros(len(x), dtype=bool)
+    xs, ys = vertices[:, 0], vertices[:, 1]
+    for i in range(len(vertices)):
+        x1, y1 = xs[i - 1], ys[i - 1]
+        x2, y2 = xs[i], ys[i]
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (x < x_at)
+    return inside
+
+
+class GridIndex:
+    """Uniform-grid spatial index over point coordinates.
+
+    Queries return the sorted positions (0-based row numbers) of the points
+    inside the shape, boundary included. Points with a missing coordinate
+    are never returned. ``cell_size`` defaults to roughly one point per cell.
+    """
+
+    def __init__(self, x, y, cell_size=None):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        valid = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        if len(valid):
+            self.x0, self.y0 = self.x[valid].min(), self.y[valid].min()
+            span = max(np.ptp(self.x[valid]), np.ptp(self.y[valid]))
+        else:
+            self.x0 = self.y0 = span = 0.0
+        if cell_size is None:
+            cell_size = span / np.sqrt(len(valid)) if len(valid) else 0.0
+        self.cell_size = float(cell_size) or 1.0
+        ix, iy = self._cell(self.x[valid], self.y[valid])
+        order = np.lexsort((iy, ix))
+        self.positions = valid[order]
+        ix, iy = ix[order], iy[order]
+        edges = np.flatnonzero((np.diff(ix) != 0) | (np.diff(iy) != 0)) + 1
+        starts = np.concatenate(([0], edges)) if len(valid) else edges
+        ends = np.concatenate((edges, [len(valid)])) if len(valid) else edges
+        ix, iy = ix.tolist(), iy.tolist()
+        self.cells = {
+            (ix[s], iy[s]): (s, e) for s, e in zip(starts.tolist(), ends.tolist())
+        }
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _cell(self, x, y):
+        return (
+            np.floor((x - self.x0) / self.cell_size).astype(np.int64),
+            np.floor((y - self.y0) / self.cell_size).astype(np.int64),
+        )
+
+    def _candidates(self, xmin, ymin, xmax, ymax):
+        ix, iy = self._cell(np.array([xmin, xmax]), np.array([ymin, ymax]))
+        (ix0, ix1), (iy0, iy1) = ix.tolist(), iy.tolist()
+        if (ix1 - ix0 + 1) * (iy1 - iy0 + 1) > len(self.cells):
+            # Large query box: walking the occupied cells is cheaper
+            keys = [k for k in self.cells if ix0 <= k[0] <= ix1 and iy0 <= k[1] <= iy1]
+        else:
+            keys = [
+                (i, j)
+                for i in range(ix0, ix1 + 1)
+                for j in range(iy0, iy1 + 1)
+                if (i, j) in self.cells
+            ]
+        if not keys:
+            return np.array([], dtype=np.intp)
+        return np.concatenate([self.positions[slice(*self.cells[k])] for k in keys])
+
+    def bbox(self, xmin, ymin, xmax, ymax):
+        found = self._candidates(xmin, ymin, xmax, ymax)
+        x, y = self.x[found], self.y[found]
+        keep = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+        return np.sort(found[keep])
+
+    def radius(self, cx, cy, r):
+        found = self._candidates(cx - r, cy - r, cx + r, cy + r)
+        keep = (self.x[found] - cx) ** 2 + (self.y[found] - cy) ** 2 <= r * r
+        return np.sort(found[keep])
+
+    def polygon(self, vertices):
+        vertices = np.asarray(vertices, dtype=float)
+        found = self._candidates(*vertices.min(axis=0), *vertices.max(axis=0))
+        keep = _points_in_polygon(self.x[found], self.y[found], vertices)
+        return np.sort(found[keep])
+
+
+_INDEXES = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def loca_index(df_loca):
+    """GridIndex of a LOCA table's (LOCA_NATE, LOCA_NATN) points.
+
+    Built once per DataFrame object and reused for as long as it is alive,
+    so repeated subset exports from one parsed file share the index.
+    """
+    key = id(df_loca)
+    with _INDEXES_LOCK:
+        ref, index = _INDEXES.get(key, (None, None))
+        if ref is not None and ref() is df_loca:
+            return index
+    missing = pd.Series(np.nan, index=df_loca.index)
+    index = GridIndex(
+        pd.to_numeric(df_loca.get("LOCA_NATE", missing), errors="coerce"),
+        pd.to_numeric(df_loca.get("LOCA_NATN", missing), errors="coerce"),
+    )
+    with _INDEXES_LOCK:
+        for stale in [k for k, (r, _) in _INDEXES.items() if r() is None]:
+            del _INDEXES[stale]
+        _INDEXES[key] = (weakref.ref(df_loca), index)
+    return index
+
+
+class SiteFilter:
+    """Subset of LOCA holes to export.
+
+    A hole is kept when it lies inside any of the given shapes or its
+    LOCA_ID is listed in ``boreholes``. Shapes use easting/northing
+    (LOCA_NATE/LOCA_NATN): ``bbox`` is ``(xmin, ymin, xmax, ymax)``,
+    ``radius`` is ``(x, y, r)`` and ``polygon`` a sequence of ``(x, y)``
+    vertices.
+    """
+
+    def __init__(self, bbox=None, polygon=None, radius=None, boreholes=()):
+        self.bbox = tuple(map(float, bbox)) if bbox else None
+        self.polygon = tuple(tuple(map(float, p)) for p in polygon or ()) or None
+        self.radius = tuple(map(float, radius)) if radius else None
+        self.boreholes = frozenset(str(b) for b in boreholes or ())
+        if self.polygon is not None and len(self.polygon) < 3:
+            raise ValueError("a polygon needs at least 3 vertices")
+
+    def key(self):
+        """Hashable description, for use in conversion cache keys."""
+        return (self.bbox, self.polygon, self.radius, tuple(sorted(self.boreholes)))
+
+    def select(self, df_loca):
+        """Boolean mask over the rows of ``df_loca``."""
+        keep = np.zeros(len(df_loca), dtype=bool)
+        if self.bbox or self.polygon or self.radius:
+            index = loca_index(df_loca)
+            if self.bbox:
+                keep[index.bbox(*self.bbox)] = True
+            if self.radius:
+                keep[index.radius(*self.radius)] = True
+            if self.polygon:
+                keep[index.polygon(self.polygon)] = True
+        if self.boreholes and "LOCA_ID" in df_loca.columns:
+            keep |= df_loca["LOCA_ID"].astype(object).isin(self.boreholes).to_numpy()
+        return keep
+
+    def apply(self, df_geol, df_loca):
+        """``(df_geol, df_loca)`` restricted to the selected holes."""
+        df_loca = df_loca[self.select(df_loca)]
+        if "LOCA_ID" in df_geol.columns:
+            holes = set(self.boreholes)
+            if "LOCA_ID" in df_loca.columns:
+                holes.update(df_loca["LOCA_ID"].astype(object).dropna())
+            df_geol = df_geol[df_geol["LOCA_ID"].astype(object).isin(holes)]
+        return df_geol, df_loca
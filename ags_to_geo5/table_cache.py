@@ -0,0 +1,216 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import pathlib
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from .ags_parser import DEFAULT_GROUPS, AgsIndex, AgsTables
+from .batch import AGS_PATTERN, collect_inputs
+
+# On-disk cache of parsed AGS projects. Each source file (keyed by the SHA-256
+# of its bytes) gets a directory holding one uncompressed Arrow IPC (Feather)
+# file per GROUP plus a manifest with the HEADING/UNIT/TYPE rows. Loading
+# memory-maps those files instead of re-tokenizing the AGS text.
+#
+# Requires pyarrow, which is imported only when the cache is actually used.
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "AGS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "ags_to_geo5")
+)
+MANIFEST = "manifest.json"
+CACHE_VERSION = 4
+
+
+def _feather():
+    try:
+        from pyarrow import feather
+    except ImportError as exc:
+        raise ImportError(
+            "The parsed-table cache needs pyarrow: pip install pyarrow"
+        ) from exc
+    return feather
+
+
+def source_digest(source):
+    """SHA-256 hex digest of AGS content given as text, bytes, path or file."""
+    if isinstance(source, str):
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return hashlib.sha256(b"").hexdigest()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return hashlib.sha256(mm).hexdigest()
+    if hasattr(source, "getvalue"):
+        return hashlib.sha256(source.getvalue()).hexdigest()
+    return hashlib.sha256(source).hexdigest()
+
+
+class CachedIndex:
+    """AgsIndex stand-in that reads group frames from a cache directory."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.groups = self.manifest["groups"]
+
+    def __contains__(self, group_name):
+        return group_name in self.groups
+
+    def __iter__(self):
+        return iter(self.groups)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def frame(self, group_name):
+        meta = self.groups.get(group_name)
+        if meta is None:
+            return pd.DataFrame()
+        table = _feather().read_table(
+            os.path.join(self.path, meta["file"]), memory_map=True
+        )
+        df = table.to_pandas()
+        df.columns = pd.Index(meta["headings"], dtype=object)
+        df.attrs["UNIT"] = dict(zip(meta["headings"], meta["units"]))
+        df.attrs["TYPE"] = dict(zip(meta["headings"], meta["types"]))
+        return df
+
+    def issues(self, groups=None):
+        # Recorded when the entry was stored, which tokenized every group
+        row_issues = self.manifest["row_issues"]
+        found = list(self.manifest["scan_issues"])
+        for name in row_issues if groups is None else groups:
+            found.extend(row_issues.get(name, ()))
+        return sorted(found, key=lambda i: i["line"] or 0)
+
+    def frames(self, groups=None, jobs=None):
+        # Memory-mapped reads are cheap enough that ``jobs`` is not needed
+        names = [g for g in (self if groups is None else groups) if g in self]
+        return {name: self.frame(name) for name in names}
+
+
+class TableCache:
+    """Directory of parsed AGS projects keyed by source content hash."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def path_for(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def __contains__(self, digest):
+        return os.path.exists(os.path.join(self.path_for(digest), MANIFEST))
+
+    def store(self, digest, index):
+        """Write every group of ``index`` to the cache; returns the entry path."""
+        feather = _feather()
+        path = self.path_for(digest)
+        if digest in self:
+            return path
+        tmp = f"{path}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        groups = {}
+        try:
+            for i, name in enumerate(index):
+                df = index.frame(name)
+                meta = {
+                    "file": f"{i:03d}.arrow",
+                    "headings": list(df.columns),
+                    "units": list(df.attrs.get("UNIT", {}).values()),
+                    "types": list(df.attrs.get("TYPE", {}).values()),
+                }
+                # Positional column names keep duplicate HEADINGs intact
+                df.columns = [str(c) for c in range(len(df.columns))]
+                feather.write_feather(
+                    df, os.path.join(tmp, meta["file"]), compression="uncompressed"
+                )
+                groups[name] = meta
+            with open(os.path.join(tmp, MANIFEST), "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "version": CACHE_VERSION,
+                        "groups": groups,
+                        "scan_issues": index.scan_issues,
+                        "row_issues": index.row_issues,
+                    },
+                    f,
+                )
+            try:
+                os.replace(tmp, path)
+            except OSError:
+                # Another process stored the same source first
+                shutil.rmtree(tmp, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return path
+
+    def index(self, source):
+        """Return a cached index for ``source``, parsing and storing it on a miss."""
+        digest = source_digest(source)
+        if digest not in self:
+            if isinstance(source, os.PathLike):
+                parsed = AgsIndex.from_path(source)
+            elif hasattr(source, "getvalue"):
+                parsed = AgsIndex(source.getvalue())
+            else:
+                parsed = AgsIndex(source)
+            self.store(digest, parsed)
+        cached = CachedIndex(self.path_for(digest))
+        if cached.manifest.get("version") != CACHE_VERSION:
+            shutil.rmtree(self.path_for(digest), ignore_errors=True)
+            return self.index(source)
+        return cached
+
+    def load_ags_tables(self, source, required=DEFAULT_GROUPS):
+        """Cached counterpart of ags_parser.load_ags_tables."""
+        return AgsTables(self.index(source), required=required)
+
+
+def warm_file(path, cache_dir):
+    start = time.perf_counter()
+    try:
+        TableCache(cache_dir).index(pathlib.Path(path))
+    except Exception as exc:
+        return path, time.perf_counter() - start, f"{type(exc).__name__}: {exc}"
+    return path, time.perf_counter() - start, None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m ags_to_geo5.table_cache",
+        description="Pre-warm the parsed-table cache for a whole AGS archive.",
+    )
+    parser.add_argument("inputs", nargs="+", help="AGS files, directories or globs")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("-j", "--jobs", type=int, default=None)
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("--pattern", default=AGS_PATTERN)
+    args = parser.parse_args(argv)
+
+    files = collect_inputs(args.inputs, args.pattern, args.recursive)
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(warm_file, f, args.cache_dir) for f in files]
+        for future in as_completed(futures):
+            path, seconds, error = future.result()
+            if error:
+                failed += 1
+                print(f"FAIL {seconds:7.2f}s  {path}: {error}", flush=True)
+            else:
+                print(f"ok   {seconds:7.2f}s  {path}", flush=True)
+    print(f"{len(files) - failed}/{len(files)} cached in {args.cache_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+# Validation of an AGS delivery. Structural problems (short or long DATA
+# rows, groups without a HEADING, repeated GROUP blocks) are recorded by
+# AgsIndex while it scans and tokenizes, so they cost no extra pass; the
+# checks between tables below run on the already-typed frames.
+
+ERROR = "error"
+WARNING = "warning"
+
+
+def issue(severity, code, message, group=None, line=None, row=None):
+    """One validation finding, as a JSON-friendly dict.
+
+    ``line`` is the 1-based line in the file and ``row`` the 1-based DATA
+    row within ``group``, when known.
+    """
+    return {
+        "severity": severity,
+        "code": code,
+        "group": group,
+        "line": line,
+        "row": row,
+        "message": message,
+    }
+
+
+def format_issue(found):
+    where = [found["group"] or ""]
+    if found["line"] is not None:
+        where.append(f"line {found['line']}")
+    elif found["row"] is not None:
+        where.append(f"DATA row {found['row']}")
+    location = " ".join(w for w in where if w)
+    prefix = f"{found['severity']}: " + (f"{location}: " if location else "")
+    return prefix + found["message"]
+
+
+class ValidationError(ValueError):
+    """Raised when validation finds errors; ``issues`` lists every finding."""
+
+    def __init__(self, issues, limit=5):
+        self.issues = issues
+        errors = [i for i in issues if i["severity"] == ERROR]
+        lines = [format_issue(i) for i in errors[:limit]]
+        if len(errors) > limit:
+            lines.append(f"... and {len(errors) - limit} more")
+        super().__init__(f"{len(errors)} error(s) in the AGS file\n" + "\n".join(lines))
+
+
+def check_geol(df_geol, df_loca):
+    """Depth and LOCA_ID consistency of GEOL against LOCA."""
+    found = []
+    if {"GEOL_TOP", "GEOL_BASE"} <= set(df_geol.columns):
+        top = pd.to_numeric(df_geol["GEOL_TOP"], errors="coerce").to_numpy()
+        base = pd.to_numeric(df_geol["GEOL_BASE"], errors="coerce").to_numpy()
+        with np.errstate(invalid="ignore"):
+            inverted = np.flatnonzero(base < top)
+        holes = df_geol.get("LOCA_ID", pd.Series("", index=df_geol.index))
+        holes = holes.astype(object).to_numpy()
+        for i in inverted.tolist():
+            found.append(
+                issue(
+                    ERROR,
+                    "inverted-depths",
+                    f"{holes[i]}: GEOL_BASE {base[i]:g} is less than "
+                    f"GEOL_TOP {top[i]:g}",
+                    "GEOL",
+                    row=i + 1,
+                )
+            )
+    if "LOCA_ID" in df_geol.columns:
+        geol_ids = df_geol["LOCA_ID"].astype(object)
+        loca_ids = df_loca["LOCA_ID"] if "LOCA_ID" in df_loca.columns else []
+        unknown = geol_ids.notna() & ~geol_ids.isin(set(pd.Series(loca_ids).dropna()))
+        # One issue per missing hole, at its first GEOL row
+        positions = np.flatnonzero(unknown.to_numpy())
+        first = pd.Series(positions).groupby(geol_ids.to_numpy()[positions]).min()
+        for hole, i in sorted(first.items(), key=lambda item: item[1]):
+            found.append(
+                issue(
+                    ERROR,
+                    "unknown-hole",
+                    f"LOCA_ID {hole!r} is not in the LOCA group",
+                    "GEOL",
+                    row=int(i) + 1,
+                )
+            )
+    return found
+
+
+# Groups an export cannot do without
+REQUIRED_GROUPS = ("GEOL", "LOCA")
+
+
+def check_groups(groups):
+    """Required groups missing from a file whose GROUP names are ``groups``."""
+    groups = list(groups)
+    if not groups:
+        # Already reported by the scan as "no-groups"
+        return []
+    return [
+        issue(ERROR, "missing-group", f"the file has no {name} group", name)
+        for name in REQUIRED_GROUPS
+        if name not in groups
+    ]
+
+
+def validate_tables(parse_issues, df_geol, df_loca, groups):
+    """All findings for one file: ``parse_issues``, check_groups, check_geol.
+
+    ``groups`` are the GROUP names found in the file.
+    """
+    return list(parse_issues) + check_groups(groups) + check_geol(df_geol, df_loca)
+
+
+def raise_for_errors(issues):
+    if any(i["severity"] == ERROR for i in issues):
+        raise ValidationError(issues)
@@ -0,0 +1,178 @@
+import hashlib
+import io
+import math
+import numbers
+import os
+import posixpath
+import re
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.utils import get_column_letter
+
+# Streamed copy of an .xlsx template: every part of the package is copied
+# byte-for-byte except the <sheetData> of the sheets being filled, which is
+# regenerated from column arrays below the template's header row. Cells are
+# written as inline strings and plain numbers, as openpyxl itself does.
+
+_NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+_NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+_SHEET_DATA_RE = re.compile(r"<sheetData\s*/>|<sheetData>.*?</sheetData>", re.S)
+_HEADER_ROW_RE = re.compile(r'<row r="1"(?:\s[^>]*)?(?:/>|>.*?</row>)', re.S)
+_DIMENSION_RE = re.compile(r'(<dimension ref="A1:[A-Z]+)\d+("\s*/>)')
+
+
+def _sheet_parts(zin):
+    """Map sheet names to their worksheet part inside the package."""
+    workbook = ET.fromstring(zin.read("xl/workbook.xml"))
+    rels = ET.fromstring(zin.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        rel.get("Id"): rel.get("Target")
+        for rel in rels.iter(f"{{{_NS_PKG_REL}}}Relationship")
+    }
+    parts = {}
+    for sheet in workbook.iter(f"{{{_NS_MAIN}}}sheet"):
+        target = targets[sheet.get(f"{{{_NS_REL}}}id")]
+        if target.startswith("/"):
+            parts[sheet.get("name")] = target.lstrip("/")
+        else:
+            parts[sheet.get("name")] = posixpath.normpath(posixpath.join("xl", target))
+    return parts
+
+
+def _cell(ref, value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        if not value:
+            return ""
+        text = escape(ILLEGAL_CHARACTERS_RE.sub("", value))
+        space = ' xml:space="preserve"' if text != text.strip() else ""
+        return f'<c r="{ref}" t="inlineStr"><is><t{space}>{text}</t></is></c>'
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}" t="n"><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        if not math.isfinite(value):  # NaN/inf are written as an empty cell
+            return ""
+        # Same 16 significant digits openpyxl writes, so 3.6 stays 3.6
+        return f'<c r="{ref}" t="n"><v>{"%.16g" % value}</v></c>'
+    return _cell(ref, str(value))
+
+
+def rows_xml(columns, first_row=2):
+    """Serialize equal-length column arrays as <row> elements."""
+    letters = [get_column_letter(i + 1) for i in range(len(columns))]
+    parts = []
+    for r, values in enumerate(zip(*columns), start=first_row):
+        cells = "".join(
+            _cell(f"{letter}{r}", value) for letter, value in zip(letters, values)
+        )
+        parts.append(f'<row r="{r}">{cells}</row>')
+    return "".join(parts), first_row + len(parts) - 1
+
+
+# Placeholder for the row number in pre-serialized rows. ILLEGAL_CHARACTERS_RE
+# strips it from cell text, so it can only ever mark a row number.
+ROW_MARK = "\x00"
+
+
+class SheetRows(list):
+    """Rows serialized once by row_fragments, renumbered on every write."""
+
+
+def row_fragments(columns):
+    """Serialize column arrays as <row> elements with a placeholder row number."""
+    letters = [get_column_letter(i + 1) for i in range(len(columns))]
+    return SheetRows(
+        f'<row r="{ROW_MARK}">'
+        + "".join(
+            _cell(f"{letter}{ROW_MARK}", value)
+            for letter, value in zip(letters, values)
+        )
+        + "</row>"
+        for values in zip(*columns)
+    )
+
+
+def _number_rows(fragments, first_row=2):
+    parts = [
+        fragment.replace(ROW_MARK, str(r))
+        for r, fragment in enumerate(fragments, start=first_row)
+    ]
+    return "".join(parts), first_row + len(parts) - 1
+
+
+def _fill_sheet(xml, columns):
+    header = _HEADER_ROW_RE.search(xml)
+    if isinstance(columns, SheetRows):
+        body, last_row = _number_rows(columns)
+    else:
+        body, last_row = rows_xml(columns)
+    sheet_data = (
+        "<sheetData>" + (header.group(0) if header else "") + body + "</sheetData>"
+    )
+    xml = _SHEET_DATA_RE.sub(lambda m: sheet_data, xml, count=1)
+    return _DIMENSION_RE.sub(
+        lambda m: f"{m.group(1)}{max(last_row, 1)}{m.group(2)}", xml
+    )
+
+
+class XlsxTemplate:
+    """Pristine in-memory copy of an .xlsx template package.
+
+    Holds the raw file bytes plus every decompressed part, so exports never
+    touch the template on disk again. Nothing here is mutated by a write.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            self.data = f.read()
+        self.digest = hashlib.sha256(self.data).hexdigest()
+        with zipfile.ZipFile(io.BytesIO(self.data)) as zin:
+            self.parts = _sheet_parts(zin)
+            self.members = [(info, zin.read(info)) for info in zin.infolist()]
+
+
+_TEMPLATES = {}
+_TEMPLATES_LOCK = threading.Lock()
+
+
+def load_template(path):
+    """Return the process-wide cached template, reloading it if its mtime changed."""
+    if isinstance(path, XlsxTemplate):
+        return path
+    key = os.path.abspath(path)
+    mtime = os.stat(key).st_mtime_ns
+    with _TEMPLATES_LOCK:
+        template = _TEMPLATES.get(key)
+        if template is None or template.mtime != mtime:
+            template = _TEMPLATES[key] = XlsxTemplate(key)
+    return template
+
+
+def write_template_sheets(template, output, sheets):
+    """Copy ``template`` to ``output`` with data rows replaced.
+
+    ``template`` is a path (served from the cache) or an XlsxTemplate.
+    ``sheets`` maps a sheet name to a list of column arrays (or a SheetRows
+    from row_fragments), written from row 2 downwards; the template's header
+    row is kept as-is and all of its other rows on that sheet are dropped.
+    ``output`` is a path or a writable binary stream.
+    """
+    template = load_template(template)
+    replaced = {template.parts[name]: columns for name, columns in sheets.items()}
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zout:
+        for info, data in template.members:
+            if info.filename in replaced:
+                xml = _fill_sheet(data.decode("utf-8"), replaced[info.filename])
+                data = xml.encode("utf-8")
+            zout.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
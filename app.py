@@ -1,51 +1,267 @@
 import streamlit as st
-import pandas as pd
-from ags_to_geo5.ags_parser import load_ags_tables
-from ags_to_geo5.exporter import export_to_excel
-import tempfile
+from ags_to_geo5.jobs import DONE, FAILED, FINISHED, RUNNING, JobQueue
 import os
-from streamlit_pdf_viewer import pdf_viewer
+
+# ags_to_geo5.batch/cache/exporter/spatial pull in pandas, numpy and openpyxl, and
+# the PDF viewer is only needed for the user guide: they are imported where
+# used, so a cold start paints the page before loading any of them
 
 st.set_page_config(layout="wide")
 
 st.title("AGS to GEO5 Excel Converter")
-st.write("Upload your AGS file and download the GEO5 import Excel file.")
+st.write("Upload your AGS files and download the GEO5 import Excel files.")
 
 TEMPLATE_FILE = "FieldTestImportTemplate.xlsx"
 
-uploaded_file = st.file_uploader("Choose an AGS file", type=["ags"])
-
-if uploaded_file is not None:
-    ags_content = uploaded_file.read().decode("utf-8")
-    ags_tables = load_ags_tables(ags_content)
-    df_geol = ags_tables["GEOL"]
-    df_loca = ags_tables["LOCA"]
-    df_abbr = ags_tables["ABBR"] if "ABBR" in ags_tables else None
-    # Ensure numeric columns for subtraction
-    for col in ["GEOL_TOP", "GEOL_BASE", "GEOL_DEPTH"]:
-        if col in df_geol.columns:
-            df_geol[col] = pd.to_numeric(df_geol[col], errors="coerce")
-    for col in ["LOCA_NATE", "LOCA_NATN", "LOCA_GL"]:
-        if col in df_loca.columns:
-            df_loca[col] = pd.to_numeric(df_loca[col], errors="coerce")
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as tmp:
-        export_to_excel(df_geol, df_loca, df_abbr, TEMPLATE_FILE, tmp.name)
-        tmp.seek(0)
-        st.success("Conversion complete! Download your file below.")
-        with open(tmp.name, "rb") as f:
+uploaded_files = st.file_uploader(
+    "Choose one or more AGS files", type=["ags"], accept_multiple_files=True
+)
+
+# Same keys as exporter.OUTPUT_FORMATS
+FORMAT_LABELS = {
+    "xlsx": "GEO5 Excel import (.xlsx)",
+    "csv": "CSV tables",
+    "parquet": "Parquet tables",
+    "jsonl": "JSON-lines tables",
+}
+output_format = st.selectbox(
+    "Output format", list(FORMAT_LABELS), format_func=FORMAT_LABELS.get
+)
+classify = st.checkbox(
+    "Fill the Layers EN ISO 14688-1 classification from the soil names"
+)
+
+with st.expander("Export only some holes (optional)"):
+    borehole_text = st.text_input("LOCA_IDs, comma separated")
+    bbox_text = st.text_input(
+        "Bounding box: min easting, min northing, max easting, max northing"
+    )
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MAX_WORKERS = 4
+
+
+@st.cache_resource
+def get_result_cache():
+    from ags_to_geo5.cache import ResultCache
+
+    # Shared by every session in this process; bounded LRU of output bytes
+    return ResultCache()
+
+
+@st.cache_resource
+def get_job_queue():
+    # One queue per server process, so all sessions share MAX_WORKERS threads
+    return JobQueue(max_workers=MAX_WORKERS)
+
+
+def convert_and_cache(
+    ags_data, key, name, output_format, site=None, classify=False, timer=None
+):
+    from ags_to_geo5.batch import convert_bytes, zip_outputs
+
+    # Validation runs with the parse, so a bad file fails before the template
+    # is opened
+    output = convert_bytes(
+        ags_data,
+        TEMPLATE_FILE,
+        timer,
+        validate=True,
+        output_format=output_format,
+        site=site,
+        classify=classify,
+    )
+    if output_format != "xlsx":
+        # Table formats give one file per sheet; cache them as a single ZIP
+        stem = os.path.splitext(name)[0]
+        output = zip_outputs(
+            {f"{stem}_{table}": data for table, data in output.items()}
+        )
+    get_result_cache().put(key, output)
+    return output
+
+
+def site_filter(borehole_text, bbox_text):
+    boreholes = [b.strip() for b in borehole_text.split(",") if b.strip()]
+    bbox = None
+    if bbox_text.strip():
+        bbox = [float(v) for v in bbox_text.split(",")]
+        if len(bbox) != 4:
+            raise ValueError("the bounding box needs exactly four numbers")
+    if not boreholes and bbox is None:
+        return None
+    from ags_to_geo5.spatial import SiteFilter
+
+    return SiteFilter(bbox=bbox, boreholes=boreholes)
+
+
+def show_finished_job(job):
+    if job.status == DONE:
+        st.write(f"Converted {job.name}")
+    elif job.status == FAILED:
+        # Validation errors list one finding per line after the summary
+        summary, *details = job.error.split("\n")
+        st.error(
+            f"{job.name}: conversion failed ({summary})"
+            + "".join(f"  \n{line}" for line in details)
+        )
+    else:
+        st.warning(f"{job.name}: conversion cancelled")
+
+
+@st.fragment(run_every=1.0)
+def show_job_progress(job_ids, cached=0):
+    # Reruns on its own every second; the whole page reruns once all are done.
+    # Finished files keep their row so each result shows as soon as it is ready
+    queue = get_job_queue()
+    jobs = [job for job in map(queue.get, job_ids) if job is not None]
+    total = len(jobs) + cached
+    done = cached + sum(job.status in FINISHED for job in jobs)
+    st.progress(done / total, text=f"{done}/{total} files done")
+    for job in jobs:
+        if job.status in FINISHED:
+            show_finished_job(job)
+            continue
+        status, cancel = st.columns([5, 1])
+        stage = f" ({job.stage})" if job.status == RUNNING and job.stage else ""
+        status.progress(job.progress, text=f"{job.name}: {job.status}{stage}")
+        if cancel.button("Cancel", key=f"cancel-{job.id}"):
+            queue.cancel(job.id)
+    if done == total:
+        st.rerun()
+
+
+try:
+    site = site_filter(borehole_text, bbox_text)
+except ValueError as exc:
+    st.error(f"Invalid hole selection: {exc}")
+    uploaded_files = None
+
+if uploaded_files:
+    from ags_to_geo5.batch import output_path_for, unzip_outputs, zip_outputs
+    from ags_to_geo5.cache import conversion_key
+
+    # Conversions run on the shared background queue; identical uploads (same
+    # bytes, same template) are served from the result cache instead
+    result_cache = get_result_cache()
+    queue = get_job_queue()
+    previous_jobs = st.session_state.get("jobs", {})
+    jobs = {}
+    outputs = {}
+    performance = {}
+    for uploaded_file in uploaded_files:
+        suffix = ".xlsx" if output_format == "xlsx" else ".zip"
+        name = output_path_for(uploaded_file.name, suffix=suffix)
+        key = conversion_key(
+            uploaded_file.getvalue(),
+            TEMPLATE_FILE,
+            site.key() if site else None,
+            output_format,
+            classify,
+        )
+        job = queue.get(previous_jobs.get((name, key)))
+        if job is None:
+            cached = result_cache.get(key)
+            if cached is not None:
+                outputs[name] = cached
+                performance[name] = {"cached": True}
+                continue
+            job = queue.get(
+                queue.submit(
+                    name,
+                    convert_and_cache,
+                    uploaded_file.getvalue(),
+                    key,
+                    name,
+                    output_format,
+                    site,
+                    classify,
+                )
+            )
+        jobs[name, key] = job.id
+    # Stop work for files that were removed from the uploader
+    for upload, job_id in previous_jobs.items():
+        if upload not in jobs:
+            queue.cancel(job_id)
+            queue.forget(job_id)
+    st.session_state["jobs"] = jobs
+
+    job_list = [queue.get(job_id) for job_id in jobs.values()]
+    if any(job.status not in FINISHED for job in job_list):
+        show_job_progress(list(jobs.values()), cached=len(outputs))
+    else:
+        for job in job_list:
+            performance[job.name] = job.to_dict()
+            if job.status == DONE:
+                outputs[job.name] = job.result
+            show_finished_job(job)
+        if any(job.status != DONE for job in job_list) and st.button("Retry"):
+            for job_id in jobs.values():
+                if queue.get(job_id).status != DONE:
+                    queue.forget(job_id)
+            st.rerun()
+        with st.expander("Performance"):
+            st.json(performance)
+
+        total = len(uploaded_files)
+        converted = len(outputs)
+        if output_format != "xlsx":
+            # Unpack each upload's table ZIP so the download holds plain files
+            outputs = {
+                member: data
+                for archive in outputs.values()
+                for member, data in unzip_outputs(archive).items()
+            }
+        if output_format == "xlsx" and len(outputs) == 1 and total == 1:
+            st.success("Conversion complete! Download your file below.")
             st.download_button(
                 label="Download GEO5 Excel File",
-                data=f,
+                data=next(iter(outputs.values())),
                 file_name="Geo5_Import.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                mime=XLSX_MIME,
+            )
+        elif outputs:
+            st.success(f"Converted {converted} of {total} files.")
+            label = "GEO5 Excel Files" if output_format == "xlsx" else "Tables"
+            st.download_button(
+                label=f"Download {label} (ZIP)",
+                data=zip_outputs(outputs),
+                file_name="Geo5_Import.zip",
+                mime="application/zip",
             )
-
-    os.unlink(tmp.name)
 
 # ---- User Guide Section ----
+USER_GUIDE_PDF = "UserGuide.pdf"
+USER_GUIDE_DOCX = "UserGuide.docx"
+
+
+@st.cache_resource
+def user_guide_pdf():
+    # Resolved once per server process: the bundled PDF, otherwise the .docx
+    # converted through the on-disk cache shared by every session
+    if os.path.exists(USER_GUIDE_PDF):
+        path = USER_GUIDE_PDF
+    elif os.path.exists(USER_GUIDE_DOCX):
+        from user_guide_utils import word_to_pdf
+
+        try:
+            path = word_to_pdf(USER_GUIDE_DOCX)
+        except Exception:
+            return None
+    else:
+        return None
+    with open(path, "rb") as f:
+        return f.read()
+
+
 st.markdown("---")
-user_guide_pdf = "UserGuide.pdf"
-if os.path.exists(user_guide_pdf):
-    pdf_viewer(user_guide_pdf, width=0)  # 0 means full width in streamlit-pdf-viewer
-else:
-    st.info("User guide not found. Please add 'UserGuide.pdf' to the app folder.")
+# The viewer sends the whole PDF to the browser, so it is only rendered on
+# the reruns where it was asked for
+if st.toggle("Show user guide"):
+    guide = user_guide_pdf()
+    if guide is not None:
+        from streamlit_pdf_viewer import pdf_viewer
+
+        pdf_viewer(guide, width=0)  # 0 means full width in streamlit-pdf-viewer
+    else:
+        st.info("User guide not found. Please add 'UserGuide.pdf' to the app folder.")
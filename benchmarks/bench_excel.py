@@ -0,0 +1,63 @@
+"""Before/after timing of export_to_excel's two writers.
+
+The openpyxl writer loads the template, runs delete_rows and writes every
+cell through openpyxl; the bulk writer streams a copy of the template and
+regenerates only the FieldTests/Layers sheet XML.
+
+Usage: python -m benchmarks.bench_excel [--boreholes 100 1000 5000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from ags_to_geo5.exporter import export_to_excel
+from benchmarks.bench_layers import make_abbr, make_geol
+
+TEMPLATE_FILE = "FieldTestImportTemplate.xlsx"
+
+
+def make_loca(n_boreholes, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "LOCA_ID": [f"BH{i:05d}" for i in range(n_boreholes)],
+            "LOCA_NATE": rng.uniform(400000, 450000, n_boreholes).round(2),
+            "LOCA_NATN": rng.uniform(380000, 390000, n_boreholes).round(2),
+            "LOCA_GL": rng.uniform(100, 200, n_boreholes).round(2),
+        }
+    )
+
+
+def time_export(df_geol, df_loca, df_abbr, bulk):
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "out.xlsx")
+        start = time.perf_counter()
+        export_to_excel(df_geol, df_loca, df_abbr, TEMPLATE_FILE, output, bulk=bulk)
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boreholes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--layers", type=int, default=6)
+    args = parser.parse_args()
+
+    df_abbr = make_abbr()
+    for n in args.boreholes:
+        df_geol = make_geol(n, args.layers)
+        df_loca = make_loca(n)
+        slow = time_export(df_geol, df_loca, df_abbr, bulk=False)
+        fast = time_export(df_geol, df_loca, df_abbr, bulk=True)
+        print(
+            f"{n:>6} boreholes: openpyxl {slow:.3f}s  bulk {fast:.3f}s  "
+            f"({slow / fast:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Full against incremental re-export after a revised delivery.
+
+Exports a synthetic file once with an ExportState, edits a few boreholes
+(one of them with a blank LOCA_ID), then times the full and incremental
+re-export of every Layers grouping and checks both give the same workbook.
+
+Usage: python -m benchmarks.bench_incremental [--holes 100 1000 5000]
+"""
+
+import argparse
+import io
+import time
+import zipfile
+
+from ags_to_geo5.batch import load_tables
+from ags_to_geo5.exporter import LAYER_GROUPINGS, export_to_excel
+from ags_to_geo5.incremental import ExportState
+from benchmarks.synthetic import generate_ags
+
+TEMPLATE_FILE = "FieldTestImportTemplate.xlsx"
+
+
+def sheets(workbook):
+    with zipfile.ZipFile(io.BytesIO(workbook)) as z:
+        return {
+            name: z.read(name)
+            for name in z.namelist()
+            if name.startswith("xl/worksheets/")
+        }
+
+
+def revise(df_geol, df_loca):
+    """A revised delivery: one hole deepened, one removed, one GL moved."""
+    df_geol = df_geol.copy()
+    df_loca = df_loca.copy()
+    holes = list(dict.fromkeys(df_geol["LOCA_ID"].astype(object)))
+    deepened = df_geol["LOCA_ID"].astype(object) == holes[1]
+    df_geol.loc[deepened, "GEOL_BASE"] += 0.5
+    df_geol = df_geol[df_geol["LOCA_ID"].astype(object) != holes[2]]
+    moved = df_loca["LOCA_ID"].astype(object) == holes[3]
+    df_loca.loc[moved, "LOCA_GL"] += 1
+    return df_geol, df_loca
+
+
+def blank_first_id(df_geol):
+    """Give the first GEOL row a blank LOCA_ID, as in some real deliveries."""
+    df_geol = df_geol.copy()
+    df_geol["LOCA_ID"] = df_geol["LOCA_ID"].astype(object)
+    df_geol.iloc[0, df_geol.columns.get_loc("LOCA_ID")] = ""
+    return df_geol
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--holes", type=int, nargs="+", default=[100, 1000, 5000])
+    args = parser.parse_args()
+
+    for n in args.holes:
+        df_geol, df_loca, df_abbr = load_tables(generate_ags(n).encode())
+        df_geol = blank_first_id(df_geol)
+        revised = revise(df_geol, df_loca)
+        for grouping in LAYER_GROUPINGS:
+            state = ExportState()
+            first = export_to_excel(
+                df_geol, df_loca, df_abbr, TEMPLATE_FILE, state=state, grouping=grouping
+            )
+            full = export_to_excel(
+                df_geol, df_loca, df_abbr, TEMPLATE_FILE, grouping=grouping
+            )
+            assert sheets(first) == sheets(full), f"{grouping}: first export differs"
+            new, fast = timed(
+                export_to_excel,
+                *revised,
+                df_abbr,
+                TEMPLATE_FILE,
+                state=state,
+                grouping=grouping,
+            )
+            full, slow = timed(
+                export_to_excel, *revised, df_abbr, TEMPLATE_FILE, grouping=grouping
+            )
+            assert sheets(new) == sheets(full), f"{grouping}: re-export differs"
+            print(
+                f"{n:>6} holes, {grouping:>8}: full {slow:.3f}s  "
+                f"incremental {fast:.3f}s  ({state.changes['rebuilt_layers']} "
+                "layers rebuilt)"
+            )
+
+
+if __name__ == "__main__":
+    main()
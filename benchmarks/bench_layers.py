@@ -0,0 +1,95 @@
+"""Scaling benchmark for the Layers table built by export_to_excel.
+
+Compares the vectorized build_layer_table with the previous nested
+LOCA_ID/GEOL_LEG groupby loop on synthetic GEOL/ABBR data.
+
+Usage: python -m benchmarks.bench_layers [--boreholes 100 1000 10000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from ags_to_geo5.exporter import build_layer_table
+from ags_to_geo5.palette import assign_colors
+
+
+def make_geol(n_boreholes, layers_per_hole=6, n_legs=40, seed=0):
+    rng = np.random.default_rng(seed)
+    n = n_boreholes * layers_per_hole
+    depth_step = rng.uniform(0.2, 3.0, size=n).round(2)
+    base = depth_step.reshape(n_boreholes, layers_per_hole).cumsum(axis=1).ravel()
+    return pd.DataFrame(
+        {
+            "LOCA_ID": np.repeat(
+                [f"BH{i:05d}" for i in range(n_boreholes)], layers_per_hole
+            ),
+            "GEOL_TOP": (base - depth_step).round(2),
+            "GEOL_BASE": base,
+            "GEOL_DESC": rng.choice(["Soft CLAY", "Dense SAND", "Firm SILT"], size=n),
+            "GEOL_LEG": pd.Categorical(
+                rng.integers(100, 100 + n_legs, size=n).astype(str)
+            ),
+        }
+    )
+
+
+def make_abbr(n_legs=40, n_other=500):
+    codes = [str(100 + i) for i in range(n_legs)] + [f"X{i}" for i in range(n_other)]
+    return pd.DataFrame(
+        {
+            "ABBR_HDNG": ["GEOL_LEG"] * n_legs + ["OTHER"] * n_other,
+            "ABBR_CODE": codes,
+            "ABBR_DESC": [f"Soil {c}" for c in codes],
+        }
+    )
+
+
+def legacy_layer_rows(df_geol, df_abbr):
+    # The per-borehole / per-layer loop export_to_excel used to run
+    out = []
+    for borehole_id, bh_data in df_geol.groupby("LOCA_ID", observed=True):
+        layers = []
+        for leg, layer_data in bh_data.groupby("GEOL_LEG", observed=True):
+            start_depth = layer_data["GEOL_TOP"].min()
+            end_depth = layer_data["GEOL_BASE"].max()
+            desc = "; ".join(layer_data["GEOL_DESC"].astype(str).tolist())
+            soil_name = leg
+            abbr_match = df_abbr[df_abbr["ABBR_CODE"] == str(leg)]
+            if not abbr_match.empty:
+                soil_name = abbr_match["ABBR_DESC"].iloc[0]
+            layers.append((borehole_id, end_depth - start_depth, soil_name, desc))
+        colors = assign_colors(len(layers)) if layers else []
+        out.extend(row + (colors[i],) for i, row in enumerate(layers))
+    return out
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--boreholes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--layers", type=int, default=6)
+    parser.add_argument("--no-legacy", action="store_true", help="skip the old loop")
+    args = parser.parse_args()
+
+    df_abbr = make_abbr()
+    for n in args.boreholes:
+        df_geol = make_geol(n, args.layers)
+        table, fast = timed(build_layer_table, df_geol, df_abbr)
+        line = f"{n:>7} boreholes, {len(table):>7} layers: vectorized {fast:.3f}s"
+        if not args.no_legacy:
+            rows, slow = timed(legacy_layer_rows, df_geol, df_abbr)
+            assert rows == list(table.itertuples(index=False, name=None))
+            line += f"  legacy {slow:.3f}s  ({slow / fast:.0f}x)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Memory held by the parsed groups with and without dictionary encoding.
+
+Compares the plain text frames (typed=False), typed frames with every text
+column kept as strings, and typed frames with repeated text columns encoded
+as categoricals, on the bundled sample and on a synthetic file.
+
+Usage: python -m benchmarks.bench_memory [AGS_FILE] [--holes N]
+"""
+
+import argparse
+
+from ags_to_geo5 import ags_parser
+from ags_to_geo5.ags_parser import AgsIndex
+from benchmarks.bench_parser import SAMPLE_FILE
+from benchmarks.synthetic import generate_ags
+
+
+def frames_bytes(index, typed=True):
+    return sum(
+        index.frame(name, typed=typed).memory_usage(deep=True).sum() for name in index
+    )
+
+
+def report(label, content):
+    index = AgsIndex(content)
+    plain = frames_bytes(index, typed=False)
+    ratio = ags_parser.CATEGORY_MAX_RATIO
+    ags_parser.CATEGORY_MAX_RATIO = 0
+    try:
+        typed = frames_bytes(index)
+    finally:
+        ags_parser.CATEGORY_MAX_RATIO = ratio
+    encoded = frames_bytes(index)
+    print(
+        f"{label}: {len(content) / 1e6:.1f} MB file, {len(index)} groups  "
+        f"text {plain / 1e6:.1f} MB  typed {typed / 1e6:.1f} MB  "
+        f"dictionary-encoded {encoded / 1e6:.1f} MB "
+        f"({1 - encoded / typed:.0%} less than typed)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ags_file", nargs="?", default=SAMPLE_FILE)
+    parser.add_argument("--holes", type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(args.ags_file, "rb") as f:
+        report(args.ags_file, f.read())
+    report(f"synthetic {args.holes} holes", generate_ags(args.holes).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
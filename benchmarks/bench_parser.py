@@ -0,0 +1,94 @@
+"""Compare the single-scan AgsIndex with the old parse-per-group loop.
+
+Usage: python -m benchmarks.bench_parser [AGS_FILE] [--scale N] [--repeat N]
+"""
+
+import argparse
+import csv
+import time
+
+import pandas as pd
+
+from ags_to_geo5.ags_parser import AgsIndex
+
+SAMPLE_FILE = "FLRG - 2025-05-20 1711 - Preliminary data - 4.ags"
+
+
+def legacy_parse_group(content, group_name):
+    # The parser as it was before AgsIndex: one full split + csv pass per group
+    lines = content.splitlines()
+    parsed = list(csv.reader(lines, delimiter=",", quotechar='"'))
+    headings = []
+    data = []
+    in_group = False
+    for row in parsed:
+        if row and row[0] == "GROUP" and len(row) > 1 and row[1] == group_name:
+            in_group = True
+            continue
+        if in_group and row and row[0] == "HEADING":
+            headings = row[1:]
+            continue
+        if in_group and row and row[0] == "DATA":
+            data.append(row[1 : len(headings) + 1])
+            continue
+        if (
+            in_group
+            and row
+            and row[0] == "GROUP"
+            and (len(row) < 2 or row[1] != group_name)
+        ):
+            break
+    return pd.DataFrame(data, columns=headings)
+
+
+def indexed_parse(content, names):
+    index = AgsIndex(content)
+    return [index.frame(g) for g in names]
+
+
+def inflate(content, scale):
+    # Repeat every DATA line `scale` times to mimic a larger delivery
+    if scale <= 1:
+        return content
+    out = []
+    for line in content.splitlines():
+        out.extend([line] * (scale if line.startswith('"DATA"') else 1))
+    return "\n".join(out) + "\n"
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ags_file", nargs="?", default=SAMPLE_FILE)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.ags_file, encoding="utf-8") as f:
+        content = inflate(f.read(), args.scale)
+    groups = list(AgsIndex(content))
+    print(f"{len(content) / 1e6:.1f} MB, {len(groups)} groups")
+
+    for label, names in (("GEOL/LOCA/ABBR", ["GEOL", "LOCA", "ABBR"]), ("all", groups)):
+        legacy = best_of(
+            lambda: [legacy_parse_group(content, g) for g in names], args.repeat
+        )
+        indexed = best_of(lambda: indexed_parse(content, names), args.repeat)
+        print(
+            f"{label:>15}: legacy {legacy:.3f}s  indexed {indexed:.3f}s  "
+            f"({legacy / indexed:.1f}x)"
+        )
+    scan = best_of(lambda: AgsIndex(content), args.repeat)
+    print(f"{'index scan':>15}: {scan:.4f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""End-to-end benchmark suite on synthetic AGS4 files of increasing size.
+
+Each case is timed (best of --repeat) and then run once more under
+tracemalloc for its peak traced allocation. Results are appended to a JSON
+Lines file together with the git commit, and every run is compared with the
+previous record of the same case and size, so slowdowns and memory growth
+between versions show up as a percentage change.
+
+Usage: python -m benchmarks.suite [--holes 100 1000 5000] [--layers 6]
+       [--extra ISPT SAMP] [--rows-per-hole 10] [--cases load export ...]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import runpy
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from ags_to_geo5.ags_parser import load_ags_tables
+from ags_to_geo5.batch import convert_file, load_tables
+from ags_to_geo5.exporter import export_to_excel
+from benchmarks.synthetic import EXTRA_GROUPS, generate_ags
+
+TEMPLATE_FILE = "FieldTestImportTemplate.xlsx"
+RESULTS_FILE = os.path.join("benchmarks", "results.jsonl")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def case_load(workdir, ags_path, data, tables):
+    # Every group, not just the exported ones, so ISPT/SAMP size counts
+    loaded = load_ags_tables(data)
+    for name in loaded:
+        loaded[name]
+
+
+def case_export(workdir, ags_path, data, tables):
+    export_to_excel(*tables, TEMPLATE_FILE)
+
+
+def case_convert(workdir, ags_path, data, tables):
+    result = convert_file(ags_path, TEMPLATE_FILE, os.path.join(workdir, "out.xlsx"))
+    if result["error"]:
+        raise RuntimeError(result["error"])
+
+
+def case_script_direct(workdir, ags_path, data, tables):
+    import ags_to_excel_direct as script
+
+    script.AGS_FILE = ags_path
+    script.TEMPLATE_FILE = os.path.join(REPO_ROOT, TEMPLATE_FILE)
+    script.OUTPUT_FILE = os.path.join(workdir, "direct.xlsx")
+    with contextlib.redirect_stdout(io.StringIO()):
+        script.main()
+
+
+def case_script_export(workdir, ags_path, data, tables):
+    # The script reads input_file.ags and the template from the working dir
+    shutil.copy(ags_path, os.path.join(workdir, "input_file.ags"))
+    shutil.copy(os.path.join(REPO_ROOT, TEMPLATE_FILE), workdir)
+    with contextlib.chdir(workdir), contextlib.redirect_stdout(io.StringIO()):
+        runpy.run_path(
+            os.path.join(REPO_ROOT, "ags_to_geo5_export.py"), run_name="__main__"
+        )
+
+
+CASES = {
+    "load": case_load,
+    "export": case_export,
+    "convert": case_convert,
+    "script_direct": case_script_direct,
+    "script_export": case_script_export,
+}
+
+
+def measure(func, args, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "diff", "--quiet", "HEAD"], cwd=REPO_ROOT
+        ).returncode
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def read_results(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _key(record):
+    return (
+        record["case"],
+        record["holes"],
+        record["layers"],
+        record["rows_per_hole"],
+        tuple(record["extra"]),
+    )
+
+
+def _change(new, old):
+    if not old:
+        return ""
+    return f"{(new - old) / old:+.0%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--holes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--layers", type=int, default=6)
+    parser.add_argument("--extra", nargs="*", default=list(EXTRA_GROUPS))
+    parser.add_argument("--rows-per-hole", type=int, default=10)
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument(
+        "--no-save", action="store_true", help="compare only, do not append results"
+    )
+    args = parser.parse_args()
+
+    previous = {}
+    for record in read_results(args.results):
+        previous[_key(record)] = record
+    run_info = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+    }
+    print(f"commit {run_info['commit']}  (results: {args.results})")
+    records = []
+    for n_holes in args.holes:
+        content = generate_ags(
+            n_holes, args.layers, args.extra, args.rows_per_hole
+        ).encode("utf-8")
+        with tempfile.TemporaryDirectory() as workdir:
+            ags_path = os.path.join(workdir, "synthetic.ags")
+            with open(ags_path, "wb") as f:
+                f.write(content)
+            tables = load_tables(content)
+            for name in args.cases:
+                seconds, peak = measure(
+                    CASES[name], (workdir, ags_path, content, tables), args.repeat
+                )
+                record = dict(
+                    run_info,
+                    case=name,
+                    holes=n_holes,
+                    layers=args.layers,
+                    rows_per_hole=args.rows_per_hole,
+                    extra=list(args.extra),
+                    input_bytes=len(content),
+                    seconds=seconds,
+                    mb_per_s=len(content) / 1e6 / seconds,
+                    peak_bytes=peak,
+                )
+                records.append(record)
+                old = previous.get(_key(record), {})
+                print(
+                    f"{name:<14}{n_holes:>6} holes {len(content) / 1e6:7.1f} MB  "
+                    f"{seconds:8.3f}s {_change(seconds, old.get('seconds')):>5}  "
+                    f"{record['mb_per_s']:7.1f} MB/s  "
+                    f"peak {peak / 1e6:7.1f} MB "
+                    f"{_change(peak, old.get('peak_bytes')):>5}",
+                    flush=True,
+                )
+    if not args.no_save:
+        with open(args.results, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+
+if __name__ == "__main__":
+    main()
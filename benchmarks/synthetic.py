@@ -0,0 +1,201 @@
+"""Generate valid AGS4 files of configurable size for benchmarking.
+
+Usage: python -m benchmarks.synthetic OUTPUT.ags [--holes N] [--layers N]
+       [--extra ISPT SAMP] [--rows-per-hole N]
+"""
+
+import argparse
+import csv
+import io
+import random
+
+SOILS = [
+    ("101", "TOPSOIL", "Soft dark brown slightly sandy TOPSOIL with rootlets."),
+    ("102", "MADE GROUND", "MADE GROUND: brown clayey gravelly SAND with brick."),
+    ("201", "CLAY", "Firm brown slightly sandy gravelly CLAY."),
+    ("202", "CLAY", "Stiff grey silty CLAY with occasional shell fragments."),
+    ("301", "SAND", "Medium dense orange brown fine to medium SAND."),
+    ("302", "GRAVEL", "Dense grey sandy subangular fine to coarse GRAVEL."),
+    ("401", "SILT", "Soft grey clayey SILT."),
+    ("501", "MUDSTONE", "Weak grey thinly laminated MUDSTONE."),
+]
+
+# HEADING, UNIT and TYPE rows for each group the generator can write
+GROUPS = {
+    "PROJ": [("PROJ_ID", "", "ID"), ("PROJ_NAME", "", "X"), ("FILE_FSET", "", "X")],
+    "ABBR": [
+        ("ABBR_HDNG", "", "X"),
+        ("ABBR_CODE", "", "X"),
+        ("ABBR_DESC", "", "X"),
+        ("ABBR_LIST", "", "X"),
+        ("ABBR_REM", "", "X"),
+        ("FILE_FSET", "", "X"),
+    ],
+    "LOCA": [
+        ("LOCA_ID", "", "ID"),
+        ("LOCA_TYPE", "", "PA"),
+        ("LOCA_STAT", "", "PA"),
+        ("LOCA_NATE", "m", "2DP"),
+        ("LOCA_NATN", "m", "2DP"),
+        ("LOCA_GREF", "", "PA"),
+        ("LOCA_GL", "m", "2DP"),
+        ("LOCA_FDEP", "m", "2DP"),
+        ("LOCA_STAR", "yyyy-mm-dd", "DT"),
+        ("FILE_FSET", "", "X"),
+    ],
+    "GEOL": [
+        ("LOCA_ID", "", "ID"),
+        ("GEOL_TOP", "m", "2DP"),
+        ("GEOL_BASE", "m", "2DP"),
+        ("GEOL_DESC", "", "X"),
+        ("GEOL_LEG", "", "PA"),
+        ("GEOL_GEOL", "", "PA"),
+        ("GEOL_STAT", "", "X"),
+        ("FILE_FSET", "", "X"),
+    ],
+    "ISPT": [
+        ("LOCA_ID", "", "ID"),
+        ("ISPT_TOP", "m", "2DP"),
+        ("ISPT_SEAT", "", "0DP"),
+        ("ISPT_MAIN", "", "0DP"),
+        ("ISPT_NPEN", "mm", "0DP"),
+        ("ISPT_NVAL", "", "0DP"),
+        ("ISPT_REP", "", "X"),
+        ("ISPT_TYPE", "", "PA"),
+        ("FILE_FSET", "", "X"),
+    ],
+    "SAMP": [
+        ("LOCA_ID", "", "ID"),
+        ("SAMP_TOP", "m", "2DP"),
+        ("SAMP_REF", "", "X"),
+        ("SAMP_TYPE", "", "PA"),
+        ("SAMP_ID", "", "ID"),
+        ("SAMP_BASE", "m", "2DP"),
+        ("SAMP_DTIM", "yyyy-mm-ddThh:mm:ss", "DT"),
+        ("SAMP_REM", "", "X"),
+        ("FILE_FSET", "", "X"),
+    ],
+}
+EXTRA_GROUPS = ("ISPT", "SAMP")
+
+
+def _write_group(writer, name, rows):
+    spec = GROUPS[name]
+    writer.writerow(["GROUP", name])
+    writer.writerow(["HEADING"] + [h for h, _, _ in spec])
+    writer.writerow(["UNIT"] + [u for _, u, _ in spec])
+    writer.writerow(["TYPE"] + [t for _, _, t in spec])
+    for row in rows:
+        writer.writerow(["DATA"] + row)
+    writer.writerow([])
+
+
+def _holes(n_holes):
+    return [f"BH{i + 1:05d}" for i in range(n_holes)]
+
+
+def _geol_rows(rng, holes, layers_per_hole):
+    for hole in holes:
+        top = 0.0
+        for _ in range(layers_per_hole):
+            base = round(top + rng.uniform(0.2, 3.0), 2)
+            code, geol, desc = rng.choice(SOILS)
+            yield [hole, f"{top:.2f}", f"{base:.2f}", desc, code, geol, "", ""]
+            top = base
+
+
+def _ispt_rows(rng, holes, rows_per_hole):
+    for hole in holes:
+        for i in range(rows_per_hole):
+            n = rng.randint(2, 50)
+            yield [
+                hole,
+                f"{1.2 + 1.5 * i:.2f}",
+                "2",
+                str(n),
+                "450",
+                str(n),
+                f"N={n}",
+                "S",
+                "",
+            ]
+
+
+def _samp_rows(rng, holes, rows_per_hole):
+    for hole in holes:
+        for i in range(rows_per_hole):
+            top = 0.5 * i
+            minute = rng.randint(0, 59)
+            yield [
+                hole,
+                f"{top:.2f}",
+                str(i + 1),
+                rng.choice("BDUW"),
+                f"{hole}-{i + 1}",
+                f"{top + 0.3:.2f}",
+                f"2024-05-{1 + i % 28:02d}T10:{minute:02d}:00",
+                "",
+                "",
+            ]
+
+
+def generate_ags(
+    n_holes, layers_per_hole=6, extra_groups=EXTRA_GROUPS, rows_per_hole=10, seed=0
+):
+    """Return the text of a synthetic AGS4 file."""
+    rng = random.Random(seed)
+    holes = _holes(n_holes)
+    out = io.StringIO()
+    writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator="\r\n")
+    _write_group(writer, "PROJ", [["SYN", "Synthetic benchmark project", ""]])
+    _write_group(
+        writer,
+        "ABBR",
+        [["GEOL_LEG", code, geol.title(), "", "", ""] for code, geol, _ in SOILS],
+    )
+    _write_group(
+        writer,
+        "LOCA",
+        (
+            [
+                hole,
+                "CP",
+                "FINAL",
+                f"{rng.uniform(400000, 450000):.2f}",
+                f"{rng.uniform(380000, 390000):.2f}",
+                "OSGB",
+                f"{rng.uniform(100, 200):.2f}",
+                f"{layers_per_hole * 1.5:.2f}",
+                "2024-05-01",
+                "",
+            ]
+            for hole in holes
+        ),
+    )
+    _write_group(writer, "GEOL", _geol_rows(rng, holes, layers_per_hole))
+    if "ISPT" in extra_groups:
+        _write_group(writer, "ISPT", _ispt_rows(rng, holes, rows_per_hole))
+    if "SAMP" in extra_groups:
+        _write_group(writer, "SAMP", _samp_rows(rng, holes, rows_per_hole))
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output")
+    parser.add_argument("--holes", type=int, default=1000)
+    parser.add_argument("--layers", type=int, default=6)
+    parser.add_argument("--extra", nargs="*", default=list(EXTRA_GROUPS))
+    parser.add_argument("--rows-per-hole", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    content = generate_ags(
+        args.holes, args.layers, args.extra, args.rows_per_hole, args.seed
+    )
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        f.write(content)
+    print(f"wrote {args.output} ({len(content) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,108 @@
 # user_guide_utils.py
 
 
+import hashlib
+import json
 import os
+import shutil
 import subprocess
-from pdf2image import convert_from_path
 
+# Converted guides are cached here, one directory per .docx content hash, so
+# LibreOffice and pdf2image only run once for each version of the document
+GUIDE_CACHE_DIR = os.environ.get(
+    "AGS_GUIDE_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "ags_to_geo5", "user_guide"),
+)
 
-def word_to_images(docx_path, output_dir, dpi=200):
+
+def docx_digest(docx_path):
+    digest = hashlib.sha256()
+    with open(docx_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _publish(tmp, path):
+    # Move a finished temporary directory into place; if another process got
+    # there first, keep theirs
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def word_to_pdf(docx_path, output_dir=GUIDE_CACHE_DIR):
+    """
+    Converts a Word document to PDF using LibreOffice, once per document content.
+    Returns the path of the cached PDF.
+    """
+    entry = os.path.join(output_dir, docx_digest(docx_path))
+    pdf_path = os.path.join(entry, "pdf", "UserGuide.pdf")
+    if os.path.exists(pdf_path):
+        return pdf_path
+    os.makedirs(entry, exist_ok=True)
+    tmp = os.path.join(entry, f"pdf.tmp-{os.getpid()}")
+    os.makedirs(tmp, exist_ok=True)
+    try:
+        # Convert docx to pdf using LibreOffice
+        subprocess.run(
+            [
+                "soffice",
+                "--headless",
+                "--convert-to",
+                "pdf",
+                "--outdir",
+                tmp,
+                docx_path,
+            ],
+            check=True,
+        )
+        # LibreOffice names the PDF as <basename>.pdf
+        base_pdf = os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"
+        os.replace(os.path.join(tmp, base_pdf), os.path.join(tmp, "UserGuide.pdf"))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _publish(tmp, os.path.dirname(pdf_path))
+    return pdf_path
+
+
+def word_to_images(docx_path, output_dir=GUIDE_CACHE_DIR, dpi=200):
     """
     Converts a Word document to PDF using LibreOffice, then to PNG images (one per page).
-    Returns a list of generated image file paths.
+    Returns a list of generated image file paths, reused while the document
+    is unchanged.
     """
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
-    pdf_path = os.path.join(output_dir, "UserGuide.pdf")
-    # Convert docx to pdf using LibreOffice
-    subprocess.run(
-        [
-            "soffice",
-            "--headless",
-            "--convert-to",
-            "pdf",
-            "--outdir",
-            output_dir,
-            docx_path,
-        ],
-        check=True,
-    )
-    # LibreOffice names the PDF as <basename>.pdf
-    base_pdf = os.path.splitext(os.path.basename(docx_path))[0] + ".pdf"
-    pdf_path = os.path.join(output_dir, base_pdf)
-    # Convert PDF to images
-    images = convert_from_path(pdf_path, dpi=dpi)
-    image_paths = []
-    for i, img in enumerate(images):
-        img_path = os.path.join(output_dir, f"UserGuide_page_{i+1}.png")
-        img.save(img_path, "PNG")
-        image_paths.append(img_path)
-    return image_paths
+    pdf_path = word_to_pdf(docx_path, output_dir)
+    pages_dir = os.path.join(os.path.dirname(os.path.dirname(pdf_path)), f"png-{dpi}")
+    manifest = os.path.join(pages_dir, "pages.json")
+    if os.path.exists(manifest):
+        with open(manifest, encoding="utf-8") as f:
+            return [os.path.join(pages_dir, name) for name in json.load(f)]
+    # pdf2image (and Pillow) are only loaded when pages must be rendered
+    from pdf2image import convert_from_path
+
+    tmp = f"{pages_dir}.tmp-{os.getpid()}"
+    os.makedirs(tmp, exist_ok=True)
+    try:
+        # Convert PDF to images
+        images = convert_from_path(pdf_path, dpi=dpi)
+        names = []
+        for i, img in enumerate(images):
+            name = f"UserGuide_page_{i+1}.png"
+            img.save(os.path.join(tmp, name), "PNG")
+            names.append(name)
+        with open(os.path.join(tmp, "pages.json"), "w", encoding="utf-8") as f:
+            json.dump(names, f)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    _publish(tmp, pages_dir)
+    return [os.path.join(pages_dir, name) for name in names]
 
 
 # Example usage (to be called from app.py):
-# from user_guide_utils import word_to_image
-# image_paths = word_to_image("UserGuide.docx", "output_images")
+# from user_guide_utils import word_to_images
+# image_paths = word_to_images("UserGuide.docx")
 # (In Streamlit: st.image(image_paths) to display)